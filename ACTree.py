@@ -1,16 +1,110 @@
-from graphviz import Digraph
+"""
+Search tree export
+Trees (a TreeNode, or a SearchTree.TreeRecorder) are written to DOT or
+newline-delimited JSON in one iterative pass, straight to the file, so deep
+or large trees need neither recursion nor the graphviz package.
 
-def draw_tree(node, graph=None):
-    if graph is None:
-        graph = Digraph()
+    exportTree(root, "ac3_tree.dot")
+    renderPdf("ac3_tree.dot")   #runs Graphviz `dot` in the background
+"""
+import json
+import os
+import subprocess
+import SearchTree as st
+
+FORMATS = ("dot", "ndjson")
+
+def walkTree(root):
+    """
+    Yields (id, parent id, label, failed) for every node, parents first
+    parent id is None for the root
+    """
+    if isinstance(root, st.TreeBranch):
+        root = root.recorder
+    if isinstance(root, st.TreeRecorder):
+        for node in range(len(root)):
+            parent = root.parent[node]
+            yield node, (None if parent == st.NONE else parent), root.label(node), bool(root.failed[node])
+        return
+    ids = {}
+    stack = [(root, None)]
+    while stack:
+        node, parent = stack.pop()
+        ident = ids[id(node)] = len(ids)
+        yield ident, parent, node.label, node.failed
+        for child in reversed(node.children):
+            stack.append((child, ident))
 
-    label = f"{node.label}"
-    color = "red" if node.failed else "black"
+def _dotString(text):
+    return '"' + str(text).replace("\\", "\\\\").replace('"', '\\"') + '"'
 
-    graph.node(str(id(node)), label, color=color)
+def writeDot(root, out):
+    """
+    Writes the tree to the open text file out as a DOT digraph
+    Failed nodes are red. Returns the number of nodes written
+    """
+    count = 0
+    out.write("digraph {\n")
+    for node, parent, label, failed in walkTree(root):
+        color = "red" if failed else "black"
+        out.write(f"\t{node} [label={_dotString(label)} color={color}]\n")
+        if parent is not None:
+            out.write(f"\t{parent} -> {node}\n")
+        count += 1
+    out.write("}\n")
+    return count
 
-    for child in node.children:
-        graph.edge(str(id(node)), str(id(child)))
-        draw_tree(child, graph)
+def writeNDJSON(root, out):
+    """
+    Writes one JSON object per node ({"id", "parent", "label", "failed"})
+    Returns the number of nodes written
+    """
+    count = 0
+    for node, parent, label, failed in walkTree(root):
+        out.write(json.dumps({"id": node, "parent": parent, "label": label,
+                              "failed": failed}) + "\n")
+        count += 1
+    return count
 
-    return graph
\ No newline at end of file
+def exportTree(root, path, fmt=None):
+    """
+    Writes the tree to path, as DOT or NDJSON (default: from the extension)
+    Returns the number of nodes written
+    """
+    if fmt is None:
+        fmt = "ndjson" if path.endswith((".ndjson", ".jsonl", ".json")) else "dot"
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt}")
+    with open(path, "w") as out:
+        if fmt == "dot":
+            return writeDot(root, out)
+        return writeNDJSON(root, out)
+
+def renderPdf(dotPath, pdfPath=None, wait=False):
+    """
+    Renders a DOT file to PDF with the Graphviz `dot` program
+    The render runs in its own process; the Popen is returned right away
+    unless wait is set. Raises FileNotFoundError when `dot` is not installed
+    """
+    if pdfPath is None:
+        pdfPath = os.path.splitext(dotPath)[0] + ".pdf"
+    process = subprocess.Popen(["dot", "-Tpdf", dotPath, "-o", pdfPath],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if wait:
+        _, err = process.communicate()
+        if process.returncode:
+            raise RuntimeError(err.decode(errors="replace").strip() or "dot failed")
+    return process
+
+def draw_tree(node, graph=None):
+    """
+    The tree as a graphviz.Digraph (needs the graphviz package)
+    """
+    from graphviz import Digraph
+    if graph is None:
+        graph = Digraph()
+    for ident, parent, label, failed in walkTree(node):
+        graph.node(str(ident), f"{label}", color="red" if failed else "black")
+        if parent is not None:
+            graph.edge(str(parent), str(ident))
+    return graph
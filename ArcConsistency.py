@@ -1,119 +1,305 @@
 import Environment as env
+import Domains as dom
 from collections import deque
 
-def get_row_neighbours(cell):
+# Arc consistency algorithms AC3 can run:
+# - ac3: revise finds supports from scratch and every arc into a pruned
+#   cell is queued again, even when it is already waiting
+# - ac2001: AC-2001, every (Xi, Xj, value) remembers its last support in
+#   Xj and revise only looks past it once that value is gone; an arc is
+#   never queued twice
+ALGORITHMS = ("ac3", "ac2001")
+
+def get_row_neighbours(cell, n=None):
+    n = env.N if n is None else n
     r, c = cell
-    return {(r, col) for col in range(env.N) if col != c}
+    return {(r, col) for col in range(n) if col != c}
 
-def get_col_neighbours(cell):
+def get_col_neighbours(cell, n=None):
+    n = env.N if n is None else n
     r, c = cell
-    return {(row, c) for row in range(env.N) if row != r}
+    return {(row, c) for row in range(n) if row != r}
 
-def get_square_neighbours(cell):
+def get_square_neighbours(cell, s=None):
+    s = env.S if s is None else s
     r, c = cell
     neighbours = set()
-    box_r, box_c = r // 3, c // 3
-    for row in range(box_r * 3, box_r * 3 + 3):
-        for col in range(box_c * 3, box_c * 3 + 3):
+    box_r, box_c = r // s, c // s
+    for row in range(box_r * s, box_r * s + s):
+        for col in range(box_c * s, box_c * s + s):
             if (row, col) != (r, c):
                 neighbours.add((row, col))
     return neighbours
 
-def get_neighbours(cell):
+# (N, S) -> (peers, arcs, index peers, index arcs), built once per grid geometry
+_PEER_TABLES = {}
+
+def _buildPeerTables(n, s):
+    table = _PEER_TABLES.get((n, s))
+    if table is None:
+        peers = {}
+        for r in range(n):
+            for c in range(n):
+                neighbours = {(r, col) for col in range(n) if col != c}
+                neighbours.update((row, c) for row in range(n) if row != r)
+                box_r, box_c = r // s * s, c // s * s
+                neighbours.update((row, col)
+                                  for row in range(box_r, box_r + s)
+                                  for col in range(box_c, box_c + s)
+                                  if (row, col) != (r, c))
+                peers[(r, c)] = tuple(sorted(neighbours))
+        arcs = tuple((Xi, Xj) for Xi in sorted(peers) for Xj in peers[Xi])
+        indexPeers = tuple(tuple(pr * n + pc for pr, pc in peers[(r, c)])
+                           for r in range(n) for c in range(n))
+        indexArcs = tuple((i, j) for i in range(n * n) for j in indexPeers[i])
+        table = (peers, arcs, indexPeers, indexArcs)
+        _PEER_TABLES[(n, s)] = table
+    return table
+
+def getPeerTable(n=None, s=None):
+    """
+    Returns (peers, arcs) for the given grid geometry
+    peers maps every cell to a tuple of its neighbours (row + column + square)
+    arcs is a tuple of every constraint arc ((r1, c1), (r2, c2))
+    Tables are computed on first use and shared afterwards
+    """
+    n = env.N if n is None else n
+    s = env.S if s is None else s
+    return _buildPeerTables(n, s)[:2]
+
+def getPeerIndex(n=None, s=None):
+    """
+    Same as getPeerTable but with cells as flat indices (r * N + c)
+    peers is a tuple indexed by cell, arcs a tuple of (i, j) pairs
+    """
+    n = env.N if n is None else n
+    s = env.S if s is None else s
+    return _buildPeerTables(n, s)[2:]
+
+def get_neighbours(cell, n=None, s=None):
     """
     All neighbours (row + column + square)
     """
-    neighbours = set()
-    neighbours.update(get_row_neighbours(cell))
-    neighbours.update(get_col_neighbours(cell))
-    neighbours.update(get_square_neighbours(cell))
-    return neighbours
+    return set(getPeerTable(n, s)[0][cell])
 
 def initializeDomain(csp):
     """
     Function that calculates domain for all empty cells
+    Returns a DomainStore (one bitmask per cell)
     """
-    domains = {}
-    board = csp.getBoard()
-    for r in range(env.N):
-        for c in range(env.N):
-            if board[r][c] !=0: #already filled
-                domains[(r,c)] = {board[r][c]}
-            else: #empty
-                domain = set(env.DOMAIN)
-                domain -= set(csp.getRow(r))
-                domain -= set(csp.getCol(c))
-                domain -= set(csp.getSquare(r // 3, c // 3))
-                domains [(r, c)] = domain
+    bits = dom.BITS
+    n = csp.n
+    domains = dom.DomainStore(n)
+    masks = domains.masks
+    for i, value in enumerate(csp.cells):
+        if value != 0: #already filled
+            masks[i] = bits[value]
+        else: #empty
+            masks[i] = csp.candidates(i // n, i % n)
 
     return domains
 
-def queueArcs(unassigned_cells):
+def queueArcs(unassigned_cells, n=None, s=None):
     """
     Builds and returns a queue of all constraint arcs
-    Each arc is ((r1, c1), (r2, c2))
+    Cells are flat indices, each arc is (i, j)
+    n, s: grid geometry (the default 9x9 when omitted)
     """
     ArcQ = deque()
-    
-    for Xi in unassigned_cells:  #Xi = (r1, c1)
-        for Xj in get_neighbours(Xi):
+    peers = getPeerIndex(n, s)[0]
+
+    for Xi in unassigned_cells:  #Xi = r1 * N + c1
+        for Xj in peers[Xi]:
             ArcQ.append((Xi, Xj))
     return ArcQ
     
-def revise(Xi, Xj, D):
+def revise(Xi, Xj, D, tracer=None):
+    """
+    Makes Xi arc consistent with Xj on the DomainStore D
+    A value of Xi only loses its support when Xj has no other value left,
+    so only an empty or singleton Xj can prune anything
+    tracer: optional callable receiving "revise", "prune" and "revised" events
+    """
     revised = False
     pruned = 0
 
-    domainXi = D[Xi]
-    domainXj = D[Xj]
-    domainXi_copy = domainXi.copy()
+    masks = D.masks
+    domainXi = masks[Xi]
+    domainXj = masks[Xj]
 
-    print(f"Revising arc ({Xi}, {Xj})")
-    print(f"Current domain of {Xi}: {sorted(list(domainXi))}")
-    print(f"Domain of {Xj}: {sorted(list(domainXj))}")
-    
-    for val in domainXi_copy:
-        compatible_exists = False
-        for val_j in domainXj:
-            if val != val_j:  #Different values
-                compatible_exists = True
-                break
-        
-        # If NO compatible values
-        if not compatible_exists:
-            #Remove val from Xi's domain
-            domainXi.remove(val)
+    if tracer is not None:
+        tracer("revise", Xi=D.cell(Xi), Xj=D.cell(Xj),
+               domainXi=dom.maskValues(domainXi), domainXj=dom.maskValues(domainXj))
+
+    if domainXj & (domainXj - 1) == 0:
+        # Xj is empty (nothing supports Xi) or a singleton (its value is unsupported)
+        unsupported = domainXi if domainXj == 0 else domainXi & domainXj
+        if unsupported:
+            #Remove values from Xi's domain
+            masks[Xi] = domainXi & ~unsupported
             revised = True
-            pruned += 1
+            pruned = dom.popcount(unsupported)
 
-            print(f"Removed value {val} from {Xi} because no supporting value exists in {Xj}")
+            if tracer is not None:
+                for val in dom.maskValues(unsupported):
+                    tracer("prune", Xi=D.cell(Xi), Xj=D.cell(Xj), value=val)
 
-    print(f"Updated domain of {Xi}: {sorted(list(domainXi))}")
-    print("-" * 40)
+    if tracer is not None:
+        tracer("revised", Xi=D.cell(Xi), domain=dom.maskValues(masks[Xi]))
     return revised, pruned
-    
 
-def AC3(csp):
-    unassigned_cells = csp.getAllUnassigned()
-    domains = initializeDomain(csp)
-    ArcQ = queueArcs(unassigned_cells)
+def reviseChecks(domainXi, domainXj):
+    """
+    Constraint checks (Xi != Xj tests) a textbook AC-3 revise makes:
+    every value of Xi scans Xj in order until one differs from it
+    """
+    if domainXj == 0:
+        return 0
+    first = domainXj & -domainXj
+    return dom.popcount(domainXi) + (1 if domainXi & first and domainXj != first else 0)
+
+def reviseResidues(Xi, Xj, D, last, tracer=None):
+    """
+    AC-2001 revise of Xi against Xj on the DomainStore D
+    last maps (Xi * cells + Xj) * N + value - 1 to the bit of the value's
+    last support in Xj; supports are searched in increasing order from the
+    one after it, which is sound as long as domains only shrink
+    Returns (revised, pruned, constraint checks)
+    tracer: optional callable receiving "revise", "prune" and "revised" events
+    """
+    masks = D.masks
+    domainXi = masks[Xi]
+    domainXj = masks[Xj]
+    N = D.N
+
+    if tracer is not None:
+        tracer("revise", Xi=D.cell(Xi), Xj=D.cell(Xj),
+               domainXi=dom.maskValues(domainXi), domainXj=dom.maskValues(domainXj))
+
+    base = (Xi * len(masks) + Xj) * N
+    unsupported = 0
+    checks = 0
+    values = domainXi
+    while values:
+        a = values & -values
+        values ^= a
+        key = base + a.bit_length() - 1
+        support = last.get(key, 0)
+        if support & domainXj:
+            continue
+        # Next support after the last one (or from the lowest value)
+        later = domainXj & ~((support << 1) - 1) if support else domainXj
+        while later:
+            b = later & -later
+            later ^= b
+            checks += 1
+            if b != a:
+                last[key] = b
+                break
+        else:
+            unsupported |= a
+
+    revised = unsupported != 0
+    pruned = 0
+    if revised:
+        masks[Xi] = domainXi & ~unsupported
+        pruned = dom.popcount(unsupported)
+        if tracer is not None:
+            for val in dom.maskValues(unsupported):
+                tracer("prune", Xi=D.cell(Xi), Xj=D.cell(Xj), value=val)
+
+    if tracer is not None:
+        tracer("revised", Xi=D.cell(Xi), domain=dom.maskValues(masks[Xi]))
+    return revised, pruned, checks
+
+
+def AC3(csp, tracer=None, domains=None, ArcQ=None, algorithm="ac3", stats=None, residues=None):
+    """
+    Runs AC-3 on the board
+    Returns (success, revisions, prunings)
+    tracer: optional callable receiving the revision events (see Tracing)
+    domains: DomainStore owned by the caller, pruned in place
+    (built from the board when omitted)
+    ArcQ: arcs to start from (every arc of the unassigned cells when omitted)
+    algorithm: one of ALGORITHMS
+    stats: optional dict, gets the constraint checks under "checks"
+    residues: AC-2001 last supports, kept by a caller that runs AC3 again
+    on the same (only shrinking) domains
+    """
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown algorithm: {algorithm} (choose from {', '.join(ALGORITHMS)})")
+    if domains is None:
+        domains = initializeDomain(csp)
+    if ArcQ is None:
+        ArcQ = queueArcs([r * csp.n + c for r, c in csp.getAllUnassigned()], csp.n, csp.s)
+    if stats is not None:
+        stats.setdefault("checks", 0)
+    if algorithm == "ac2001":
+        return _AC2001(csp, tracer, domains, ArcQ, stats, {} if residues is None else residues)
+    peers = getPeerIndex(csp.n, csp.s)[0]
+    masks = domains.masks
 
     revision = 0
     pruning = 0
 
     while ArcQ:
         Xi, Xj = ArcQ.popleft()
-        revised, pruned = revise(Xi, Xj, domains)
+        if stats is not None:
+            stats["checks"] += reviseChecks(masks[Xi], masks[Xj])
+        revised, pruned = revise(Xi, Xj, domains, tracer)
         revision += 1
 
         if revised:
             pruning += pruned
-            if len(domains[Xi]) == 0:
-                print(f"Inconsistent! Empty domain for {Xi}")
+            if domains.masks[Xi] == 0:
+                if tracer is not None:
+                    tracer("wipeout", cell=domains.cell(Xi))
                 return False, revision, pruning
 
-            for neighbour in get_neighbours(Xi):
+            for neighbour in peers[Xi]:
                 if neighbour != Xj:
                     ArcQ.append((neighbour, Xi))
     
-    return True, revision, pruning
\ No newline at end of file
+    return True, revision, pruning
+
+def _AC2001(csp, tracer, domains, ArcQ, stats, last):
+    """
+    AC3 with algorithm="ac2001"
+    """
+    peers = getPeerIndex(csp.n, csp.s)[0]
+    queue = deque()
+    queued = set()
+    for arc in ArcQ:
+        if arc not in queued:
+            queued.add(arc)
+            queue.append(arc)
+
+    revision = 0
+    pruning = 0
+    checks = 0
+
+    while queue:
+        arc = queue.popleft()
+        queued.discard(arc)
+        Xi, Xj = arc
+        revised, pruned, checked = reviseResidues(Xi, Xj, domains, last, tracer)
+        revision += 1
+        checks += checked
+
+        if revised:
+            pruning += pruned
+            if domains.masks[Xi] == 0:
+                if tracer is not None:
+                    tracer("wipeout", cell=domains.cell(Xi))
+                if stats is not None:
+                    stats["checks"] += checks
+                return False, revision, pruning
+
+            for neighbour in peers[Xi]:
+                if neighbour != Xj and (neighbour, Xi) not in queued:
+                    queued.add((neighbour, Xi))
+                    queue.append((neighbour, Xi))
+
+    if stats is not None:
+        stats["checks"] += checks
+    return True, revision, pruning
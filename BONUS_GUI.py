@@ -1,70 +1,171 @@
 # sudoku_gui.py
-import sys
-import io
 import traceback
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, font
 import time
+import queue
+import threading
 
 # Project modules (assumed to exist in the same project)
 import Environment as env
 import Creation
 import SolveAC as ACS
 import Backtracking as BK
+import SolveMAC as MAC
 import ACTree as tree 
 import ArcConsistency as ac
+import SearchTree as st
+import SolveCache
+import SolveStats
+import Tracing as tr
+from contextlib import nullcontext
 
 # ------------------ Utilities ------------------
 
-class StdoutRedirector:
-    """Capture print() output (used for AC-3 / solver logs)."""
-    def __init__(self):
-        self.buffer = io.StringIO()
-        self._orig = None
-
-    def __enter__(self):
-        self._orig = sys.stdout
-        sys.stdout = self.buffer
-        return self
-
-    def __exit__(self, exc_type, exc, tb):
-        sys.stdout = self._orig
-        if exc_type:
-            traceback.print_exception(exc_type, exc, tb, file=self.buffer)
-
-    def getvalue(self):
-        return self.buffer.getvalue()
-
-
-def draw_tree(root):
-    graph = tree.draw_tree(root)
-    graph.render("ac3_tree", format="pdf", cleanup=True)
+POLL_MS = 100       # how often the GUI drains the solver queue
+POLL_BATCH = 2000   # queue messages handled per poll, keeps the window responsive
+CACHE_SIZE = 1000   # full solves remembered (isomorphic puzzles share an entry)
+
+class QueueTracer:
+    """Solver tracer (see Tracing) that sends the detailed AC-3 log and the
+    revision count to the GUI through a queue. Raises SearchCancelled once
+    cancel is set."""
+    def __init__(self, events, cancel):
+        self.events = events
+        self.cancel = cancel
+        self.revisions = 0
+        self._format = tr.textTracer(lambda text: events.put(("log", text)))
+
+    def __call__(self, event, **info):
+        if self.cancel.is_set():
+            raise BK.SearchCancelled()
+        if event == "revise":
+            self.revisions += 1
+            if self.revisions % BK.PROGRESS_EVERY == 0:
+                self.events.put(("progress", {"revisions": self.revisions}))
+        self._format(event, **info)
+
+
+def solve_worker(kind, board, render, events, cancel, cache=None, profiler=None):
+    """Runs AC-3 (kind "ac3"), the full solve (AC-3 + MAC, kind "full") or puzzle
+    generation on the empty board (kind "generate") in a worker thread.
+    Everything reaches the GUI through events: ("log", text) and ("progress", counts)
+    while solving, then one ("done", result), ("cancelled", None) or ("error", message).
+    result["stats"] is the SolveStats of the whole solve.
+    cache: optional SolveCache.SolveCache, a full solve it already knows skips the search.
+    profiler: optional SolveStats.Profiler, the solve runs under it and its hottest
+    functions are logged."""
+    with profiler or nullcontext():
+        finished = _solve(kind, board, render, events, cancel, cache)
+    if profiler is not None:
+        events.put(("log", "Profile (hottest functions so far):\n" + profiler.report(15)))
+    events.put(finished)
+
+
+def _solve(kind, board, render, events, cancel, cache):
+    """solve_worker without the profiler, returns the final event."""
+    tracer = QueueTracer(events, cancel)
+    stats = SolveStats.SolveStats()
+    start = time.perf_counter()
+    try:
+        def progress(stats):
+            if cancel.is_set():
+                raise BK.SearchCancelled()
+            events.put(("progress", {"nodes": stats["nodes"], "revisions": stats.get("revisions", 0)}))
+
+        if kind == "generate":
+            Creation.generateRandom(board, progress=progress)
+            stats["seconds"] = elapsed = time.perf_counter() - start
+            return "done", {"board": board, "stats": stats, "elapsed": elapsed, "render": None}
+        line = key = None
+        if kind == "full" and cache is not None:
+            line = Creation.boardToLine(board)
+            key = cache.key(line)
+            found, solution = cache.lookup(line, key)
+            if found:
+                info = cache.stats()
+                events.put(("log", f"Solve cache hit ({info['hits']} hits, {info['misses']} misses)."))
+                # a cached unsolvable puzzle goes down the failure path, not the solved one
+                result = {"board": board, "success": solution is not None, "revision": 0, "pruned": 0,
+                          "after_ac": board.getBoard(),
+                          "solution": None if solution is None else Creation.boardFromLine(solution),
+                          "stats": stats, "render": None}
+                stats["seconds"] = result["elapsed"] = time.perf_counter() - start
+                return "done", result
+        root = st.TreeRecorder(("ROOT", None))
+        AC_node = root.branch(("AC", None))
+        success, revision, pruned = ACS.enforceArcConsistency(board, AC_node, tracer=tracer,
+                                                              stats=stats)
+        stats["revisions"] += revision
+        stats["prunings"] += pruned
+        result = {"board": board, "success": success, "revision": revision, "pruned": pruned,
+                  "stats": stats}
+        events.put(("progress", {"revisions": revision}))
+
+        if kind == "full" and success:
+            result["after_ac"] = board.getBoard()
+            BT_node = root.branch(("MAC", None))
+            result["solution"] = MAC.macSearch(board, BT_node, Randomize=False, stats=stats,
+                                               progress=progress)
+            if key is not None:
+                solution = result["solution"]
+                cache.store(line, None if solution is None else Creation.boardToLine(solution), key)
+            events.put(("progress", {"nodes": stats["nodes"], "revisions": stats["revisions"]}))
+
+        stats["seconds"] = result["elapsed"] = time.perf_counter() - start
+        result["render"] = draw_tree(root, render)
+        return "done", result
+    except BK.SearchCancelled:
+        return "cancelled", None
+    except Exception as e:
+        traceback.print_exc()
+        return "error", str(e)
+
+
+TREE_PATH = "ac3_tree.dot"
+
+def draw_tree(root, render=True):
+    """Write the search tree as DOT and start the PDF render in the background.
+    Returns the render process, or None (no render, or Graphviz not installed)."""
+    tree.exportTree(root, TREE_PATH)
+    if not render:
+        return None
+    try:
+        return tree.renderPdf(TREE_PATH)
+    except FileNotFoundError:
+        return None
+
+
+def char_value(text):
+    """Value of a cell character (env.VALUE_CHARS), 0 when empty or unknown."""
+    return max(env.VALUE_CHARS.find(text.strip().upper()), 0)
 
 
 def board_to_text(board_obj):
-    """Return 9-line string representation (0 for empty)."""
+    """Return n-line string representation (0 for empty)."""
     b = board_obj.getBoard()
-    return '\n'.join(''.join(str(x) for x in b[r]) for r in range(env.N))
+    return '\n'.join(''.join(env.VALUE_CHARS[x] for x in b[r]) for r in range(board_obj.n))
 
 
 def text_to_board(text):
-    """Parse a 9-line representation into a new env.sudoku() object.
-    Accepts contiguous digits or space-separated digits.
-    Non-digits are treated as 0."""
+    """Parse an n-line representation (or a single puzzle line) into a new
+    env.sudoku() object; n is the number of lines (4, 9, 16 or 25).
+    Accepts contiguous characters or space-separated ones.
+    Unknown characters are treated as 0."""
     lines = [ln.strip() for ln in text.strip().splitlines() if ln.strip() != '']
-    if len(lines) < env.N:
-        raise ValueError("Not enough lines for a 9x9 board.")
-    g = env.sudoku()
-    for r in range(env.N):
+    if len(lines) == 1:
+        return Creation.boardFromLine(lines[0])
+    n = len(lines)
+    env.squareSize(n)
+    g = env.sudoku(n)
+    for r in range(n):
         line = lines[r]
         tokens = line.split()
-        if len(tokens) == env.N:
-            for c in range(env.N):
-                ch = tokens[c]
-                g.addNum(r, c, int(ch) if ch.isdigit() else 0)
-        else:
-            for c in range(env.N):
-                g.addNum(r, c, int(line[c]) if c < len(line) and line[c].isdigit() else 0)
+        if len(tokens) != n:
+            tokens = line
+        for c in range(n):
+            val = char_value(tokens[c]) if c < len(tokens) else 0
+            g.addNum(r, c, val if val <= n else 0)
     return g
 
 
@@ -90,9 +191,20 @@ class SudokuGUI(tk.Tk):
 
         # State
         self.cells = {}                      # (r,c) -> Entry widget
+        self.n = env.N                       # size of the grid on screen
         self.original_board = None           # snapshot of original numbers
-        self.last_assign_source = {}         # (r,c) -> "original"|"ac3"|"backtracking"|"user"
+        self.last_assign_source = {}         # (r,c) -> "original"|"ac3"|"mac"|"user"
         self.current_board = env.sudoku()
+        self.render_pdf = tk.BooleanVar(value=True)
+        self.render_process = None           # background Graphviz render of the last tree
+        self.worker = None                   # thread running the current solve
+        self.events = queue.Queue()          # solver -> GUI messages
+        self.cancel_event = threading.Event()
+        self.progress_var = tk.StringVar(value="")
+        self.solve_cache = SolveCache.SolveCache(CACHE_SIZE)
+        # cProfile of the solves, on from the start when $SUDOKU_PROFILE names a file
+        self.profile_solves = tk.BooleanVar(value=SolveStats.profilePath() is not None)
+        self.profiler = None
 
         # Build UI
         self._build_header()
@@ -112,19 +224,28 @@ class SudokuGUI(tk.Tk):
         for i, color in enumerate(["#eef4ff", "#e6f0ff", "#dfe9ff"]):
             header.create_rectangle(0, i * 23, w, (i + 1) * 23, fill=color, outline=color)
         header.create_text(20, 36, anchor="w", text="Sudoku CSP Visualizer", font=self.header_font, fill="#222")
-        header.create_text(20, 52, anchor="w", text="Arc Consistency (AC-3) • Backtracking • Visual logs", font=self.small_font, fill="#555")
+        header.create_text(20, 52, anchor="w", text="Arc Consistency (AC-3) • MAC search • Visual logs", font=self.small_font, fill="#555")
 
     def _build_controls(self):
         frame = ttk.Frame(self)
         frame.pack(fill="x", padx=12, pady=(4, 8))
 
         left = ttk.Frame(frame); left.pack(side="left", anchor="n")
-        ttk.Button(left, text="Generate Puzzle", command=self.on_generate, style="Accent.TButton").grid(row=0, column=0, padx=4, pady=4)
+        generate_button = ttk.Button(left, text="Generate Puzzle", command=self.on_generate, style="Accent.TButton")
+        generate_button.grid(row=0, column=0, padx=4, pady=4)
         ttk.Button(left, text="Validate Input", command=self.on_validate).grid(row=0, column=1, padx=4, pady=4)
-        ttk.Button(left, text="Solve using AC-3", command=self.on_ac3).grid(row=0, column=2, padx=4, pady=4)
-        ttk.Button(left, text="Full Solve (AC3 + Backtracking)", command=self.on_full_solve).grid(row=0, column=3, padx=4, pady=4)
+        ac3_button = ttk.Button(left, text="Solve using AC-3", command=self.on_ac3)
+        ac3_button.grid(row=0, column=2, padx=4, pady=4)
+        full_button = ttk.Button(left, text="Full Solve (AC3 + MAC)", command=self.on_full_solve)
+        full_button.grid(row=0, column=3, padx=4, pady=4)
+        self.solve_buttons = [generate_button, ac3_button, full_button]
         ttk.Button(left, text="Clear Board", command=self.on_clear).grid(row=0, column=4, padx=4, pady=4)
         ttk.Button(left, text="Show Constraint Graph", command=self.on_show_graph).grid(row=0, column=5, padx=4, pady=4)
+        ttk.Checkbutton(left, text="Render PDF", variable=self.render_pdf).grid(row=0, column=6, padx=4, pady=4)
+        ttk.Checkbutton(left, text="Profile solves", variable=self.profile_solves).grid(row=1, column=6, padx=4, pady=4)
+        self.cancel_button = ttk.Button(left, text="Cancel", command=self.on_cancel, state="disabled")
+        self.cancel_button.grid(row=1, column=0, padx=4, pady=4)
+        ttk.Label(left, textvariable=self.progress_var, font=self.small_font).grid(row=1, column=1, columnspan=5, sticky="w", padx=4)
 
 
         right = ttk.Frame(frame); right.pack(side="right", anchor="n")
@@ -139,12 +260,32 @@ class SudokuGUI(tk.Tk):
         self.grid_canvas = tk.Canvas(board_frame, width=500, height=500, bg="white", highlightthickness=0)
         self.grid_canvas.pack()
 
-        cell_size = 55
+        self._draw_grid()
+
+        legend = ttk.Frame(board_frame); legend.pack(pady=(8, 0))
+        def make_legend(text, color):
+            lbl = tk.Label(legend, text=text, bg=color, fg="#111", padx=10, pady=4)
+            lbl.pack(side="left", padx=6)
+        make_legend("Given", "#a9a9a9")
+        make_legend("AC-3 assigned", "#c9f0d6")
+        make_legend("MAC search", "#d7f0ff")
+        make_legend("User", "#fff8dc")
+        make_legend("Invalid (conflict)", "#ffb3b3")
+
+    def _draw_grid(self):
+        """(Re)build the n x n entries and box lines for self.n."""
+        for e in self.cells.values():
+            e.destroy()
+        self.grid_canvas.delete("all")
+        n = self.n
+        s = env.squareSize(n)
+        cell_size = 495 // n
         padding = 2
+        self.cell_font.configure(size=max(8, 162 // n))
         self.cells = {}
 
-        for r in range(env.N):
-            for c in range(env.N):
+        for r in range(n):
+            for c in range(n):
                 x = c * cell_size
                 y = r * cell_size
                 e = tk.Entry(self.grid_canvas, width=2, font=self.cell_font, justify="center", bd=0, relief="ridge")
@@ -155,20 +296,17 @@ class SudokuGUI(tk.Tk):
                 self.grid_canvas.create_window(x + cell_size/2, y + cell_size/2, window=e, width=cell_size-2*padding, height=cell_size-2*padding)
                 self.cells[(r, c)] = e
 
-        for i in range(env.N + 1):
-            thickness = 3 if i % 3 == 0 else 1
-            self.grid_canvas.create_line(0, i * cell_size, 9 * cell_size, i * cell_size, width=thickness, fill="#000")
-            self.grid_canvas.create_line(i * cell_size, 0, i * cell_size, 9 * cell_size, width=thickness, fill="#000")
+        for i in range(n + 1):
+            thickness = 3 if i % s == 0 else 1
+            self.grid_canvas.create_line(0, i * cell_size, n * cell_size, i * cell_size, width=thickness, fill="#000")
+            self.grid_canvas.create_line(i * cell_size, 0, i * cell_size, n * cell_size, width=thickness, fill="#000")
 
-        legend = ttk.Frame(board_frame); legend.pack(pady=(8, 0))
-        def make_legend(text, color):
-            lbl = tk.Label(legend, text=text, bg=color, fg="#111", padx=10, pady=4)
-            lbl.pack(side="left", padx=6)
-        make_legend("Given", "#a9a9a9")
-        make_legend("AC-3 assigned", "#c9f0d6")
-        make_legend("Backtracking", "#d7f0ff")
-        make_legend("User", "#fff8dc")
-        make_legend("Invalid (conflict)", "#ffb3b3")
+    def _set_size(self, n):
+        """Switch the grid on screen to an n x n board."""
+        if n != self.n:
+            self.n = n
+            self._draw_grid()
+            self.reset_board_colors()
 
     def _build_logs(self):
         right_frame = ttk.Frame(self)
@@ -184,7 +322,7 @@ class SudokuGUI(tk.Tk):
             return True
         if len(P) > 1:
             return False
-        return P.isdigit() and 1 <= int(P) <= 9
+        return 1 <= char_value(P) <= self.n
 
     def _on_key_release(self, event):
         # while typing, color cell as user (but do not write to model until focusout)
@@ -199,13 +337,13 @@ class SudokuGUI(tk.Tk):
         for (r, c), w in self.cells.items():
             if w is widget:
                 txt = w.get().strip()
-                val = int(txt) if txt.isdigit() else 0
+                val = char_value(txt)
 
                 # before adding to board → check validity
                 if val != 0 and not self.is_valid_move(r, c, val):
                     # highlight conflict and show message
                     w.config(bg="#ffb3b3")
-                    messagebox.showwarning("Invalid Move", f"Placing {val} at row {r+1}, col {c+1} violates Sudoku constraints.")
+                    messagebox.showwarning("Invalid Move", f"Placing {env.VALUE_CHARS[val]} at row {r+1}, col {c+1} violates Sudoku constraints.")
                     # do NOT update model with invalid value
                     return
 
@@ -223,22 +361,24 @@ class SudokuGUI(tk.Tk):
             return True  # empty is always valid
 
         b = self.current_board.getBoard()
+        n = self.current_board.n
+        s = self.current_board.s
 
         # Check row
-        for j in range(env.N):
+        for j in range(n):
             if j != c and b[r][j] == val:
                 return False
 
         # Check column
-        for i in range(env.N):
+        for i in range(n):
             if i != r and b[i][c] == val:
                 return False
 
-        # Check 3x3 box
-        br = (r // 3) * 3
-        bc = (c // 3) * 3
-        for i in range(br, br + 3):
-            for j in range(bc, bc + 3):
+        # Check box
+        br = (r // s) * s
+        bc = (c // s) * s
+        for i in range(br, br + s):
+            for j in range(bc, bc + s):
                 if (i, j) != (r, c) and b[i][j] == val:
                     return False
 
@@ -246,21 +386,21 @@ class SudokuGUI(tk.Tk):
 
     # ---------- Board <-> UI syncing ----------
     def reset_board_colors(self):
-        self.last_assign_source = {(r, c): "user" for r in range(env.N) for c in range(env.N)}
+        self.last_assign_source = {(r, c): "user" for r in range(self.n) for c in range(self.n)}
 
     def refresh_grid_from_board(self, board_obj, mark_original=True):
         """Update GUI entries to match board_obj (env.sudoku())."""
         board = board_obj.getBoard()
         if mark_original and self.original_board is None:
-            self.original_board = [[board[r][c] for c in range(env.N)] for r in range(env.N)]
+            self.original_board = board_obj.copy().getBoard()
 
-        for r in range(env.N):
-            for c in range(env.N):
+        for r in range(self.n):
+            for c in range(self.n):
                 val = board[r][c]
                 ent = self.cells[(r, c)]
                 ent.delete(0, "end")
                 if val != 0:
-                    ent.insert(0, str(val))
+                    ent.insert(0, env.VALUE_CHARS[val])
 
                 if self.original_board and self.original_board[r][c] != 0:
                     self.last_assign_source[(r, c)] = "original"
@@ -276,9 +416,9 @@ class SudokuGUI(tk.Tk):
             ent.config(bg="#a9a9a9", fg="#111", state="readonly")
         elif src == "ac3":
             ent.config(bg="#c9f0d6", fg="#062b12", state="normal")
-        elif src == "backtracking":
+        elif src == "mac":
             ent.config(bg="#d7f0ff", fg="#04223a", state="normal")
-        elif self.current_board.getBoard()[r][c] == 0:
+        elif self.current_board.get(r, c) == 0:
             ent.config(bg="white", fg="#111", state="normal")
         else:
             # user-entered valid cell
@@ -286,20 +426,10 @@ class SudokuGUI(tk.Tk):
 
     # ---------- Actions ----------
     def on_generate(self):
-        try:
-            self.current_board = env.sudoku()
-            Creation.generateRandom(self.current_board)
-            self.original_board = [[self.current_board.getBoard()[r][c] for c in range(env.N)] for r in range(env.N)]
-            for r in range(env.N):
-                for c in range(env.N):
-                    self.last_assign_source[(r, c)] = "original" if self.original_board[r][c] != 0 else "user"
-            self.refresh_grid_from_board(self.current_board, mark_original=False)
-            self.log("Generated a new puzzle (50 cells removed).")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate puzzle:\n{e}")
+        self._start_solve("generate")
 
     def on_clear(self):
-        self.current_board = env.sudoku()
+        self.current_board = env.sudoku(self.n)
         self.original_board = None
         self.reset_board_colors()
         self.refresh_grid_from_board(self.current_board, mark_original=False)
@@ -313,9 +443,10 @@ class SudokuGUI(tk.Tk):
             with open(path, "r") as f:
                 data = f.read()
             self.current_board = text_to_board(data)
-            self.original_board = [[self.current_board.getBoard()[r][c] for c in range(env.N)] for r in range(env.N)]
-            for r in range(env.N):
-                for c in range(env.N):
+            self._set_size(self.current_board.n)
+            self.original_board = self.current_board.copy().getBoard()
+            for r in range(self.n):
+                for c in range(self.n):
                     self.last_assign_source[(r, c)] = "original" if self.original_board[r][c] != 0 else "user"
             self.refresh_grid_from_board(self.current_board, mark_original=False)
             self.log(f"Loaded puzzle from {path}")
@@ -348,94 +479,160 @@ class SudokuGUI(tk.Tk):
             messagebox.showerror("Error", f"Validation failed:\n{e}")
 
     def _pull_entries_to_board(self):
-        for r in range(env.N):
-            for c in range(env.N):
-                txt = self.cells[(r, c)].get().strip()
-                val = int(txt) if txt.isdigit() else 0
+        for r in range(self.n):
+            for c in range(self.n):
+                val = char_value(self.cells[(r, c)].get())
                 self.current_board.addNum(r, c, val)
                 if self.original_board and self.original_board[r][c] != val:
                     self.last_assign_source[(r, c)] = "user"
 
     def on_ac3(self):
-        try:
-            self._pull_entries_to_board()
-            with StdoutRedirector() as rd:
-                start = time.time()
-                
-                root = env.TreeNode(("ROOT", None))
-                AC_node = env.TreeNode(("AC", None))
-                success, revision, pruned = ACS.enforceArcConsistency(self.current_board, AC_node)
-                root.add_child(AC_node)
-
-                elapsed = time.time() - start
-                draw_tree(root)
-            log = rd.getvalue().strip() or "(no output generated by AC-3)"
-            self._append_log(log)
-            if not success:
-                messagebox.showerror("AC-3 Result", "AC-3 detected inconsistency (no solution possible). See logs.")
-                self.log("AC-3: inconsistent (empty domain encountered).")
-                return
-            # mark new ac3 assignments
-            for r in range(env.N):
-                for c in range(env.N):
-                    prev = self.original_board[r][c] if self.original_board else 0
-                    val = self.current_board.getBoard()[r][c]
-                    if prev == 0 and val != 0:
-                        self.last_assign_source[(r, c)] = "ac3"
-            self.refresh_grid_from_board(self.current_board, mark_original=False)
-            messagebox.showinfo("AC-3 Complete", f"AC-3 finished in {elapsed:.2f} seconds. See logs.")
-            self.log(f"Total revisions {revision} and domains pruned {pruned}")
-            self.log(f"AC-3 finished in {elapsed:.2f}s.")
-        except Exception as e:
-            traceback.print_exc()
-            messagebox.showerror("Error running AC-3", str(e))
+        self._start_solve("ac3")
 
     def on_full_solve(self):
-        try:
-            self._pull_entries_to_board()
-            with StdoutRedirector() as rd:
-                start = time.time()
-
-                root = env.TreeNode(("ROOT", None))
-                AC_node = env.TreeNode(("AC", None))
-                ac_success, revision, pruned = ACS.enforceArcConsistency(self.current_board, AC_node)
-                root.add_child(AC_node)
-
-                BT_node = env.TreeNode(("BTS", None))
-                solution = BK.backtrackingSearch(self.current_board, BT_node, Randomize=False)
-                root.add_child(BT_node)
-
-                elapsed = time.time() - start
-                draw_tree(root)
-
-            log = rd.getvalue().strip() or "(no output generated)"
-            self._append_log(log)
-            if not ac_success:
-                messagebox.showerror("Result", "AC-3 detected inconsistency first; no solution.")
-                self.log("AC-3 declared inconsistency; aborting full solve.")
-                return
-            if solution is None:
-                messagebox.showwarning("Full Solve", "AC-3 completed but backtracking did not find a solution.")
-                self.log("Full Solve: backtracking returned None.")
-                self.refresh_grid_from_board(self.current_board, mark_original=False)
+        self._start_solve("full")
+
+    def on_cancel(self):
+        if self.worker is not None:
+            self.cancel_event.set()
+            self.log("Cancelling...")
+
+    # ---------- Background solving ----------
+    def _set_running(self, running):
+        for button in self.solve_buttons:
+            button.config(state="disabled" if running else "normal")
+        self.cancel_button.config(state="normal" if running else "disabled")
+
+    def _start_solve(self, kind):
+        if self.worker is not None:
+            return
+        if kind == "generate":
+            board = env.sudoku(self.n)
+        else:
+            try:
+                self._pull_entries_to_board()
+            except Exception as e:
+                traceback.print_exc()
+                messagebox.showerror("Error", str(e))
                 return
-            # apply solution and mark backtracking assignments
-            for r in range(env.N):
-                for c in range(env.N):
-                    orig = self.original_board[r][c] if self.original_board else 0
-                    current_val = self.current_board.getBoard()[r][c]
-                    solved_val = solution.getBoard()[r][c]
-                    if orig == 0 and solved_val != 0 and current_val != solved_val:
-                        self.last_assign_source[(r, c)] = "backtracking"
-                        self.current_board.addNum(r, c, solved_val)
+            # The worker solves a copy, the board shown stays untouched until it is done
+            board = Creation.copyBoard(self.current_board)
+        self.events = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.solve_kind = kind
+        self.solve_start = time.time()
+        self.progress = {"nodes": 0, "revisions": 0}
+        profiler = None
+        if self.profile_solves.get():
+            # One profile adds up over the solves, saved to $SUDOKU_PROFILE when set
+            if self.profiler is None:
+                self.profiler = SolveStats.Profiler(SolveStats.profilePath())
+            profiler = self.profiler
+        self.worker = threading.Thread(target=solve_worker, daemon=True,
+                                       args=(kind, board, self.render_pdf.get(), self.events, self.cancel_event,
+                                             self.solve_cache, profiler))
+        self._set_running(True)
+        self.worker.start()
+        self.after(POLL_MS, self._poll_solve)
+
+    def _poll_solve(self):
+        lines = []
+        finished = None
+        try:
+            for _ in range(POLL_BATCH):
+                kind, payload = self.events.get_nowait()
+                if kind == "log":
+                    lines.append(payload)
+                elif kind == "progress":
+                    self.progress.update(payload)
+                else:
+                    finished = (kind, payload)
+                    break
+        except queue.Empty:
+            pass
+        if lines:
+            self._append_log("\n".join(lines))
+        elapsed = time.time() - self.solve_start
+        self.progress_var.set(f"Nodes: {self.progress['nodes']}   Revisions: {self.progress['revisions']}   "
+                              f"Elapsed: {elapsed:.1f}s")
+        if finished is None:
+            self.after(POLL_MS, self._poll_solve)
+            return
+
+        self.worker = None
+        self._set_running(False)
+        kind, payload = finished
+        if kind == "cancelled":
+            self.log(f"Solve cancelled after {elapsed:.2f}s; the board is unchanged.")
+        elif kind == "error":
+            messagebox.showerror("Solver Error", payload)
+        elif self.solve_kind == "generate":
+            self._finish_generate(payload)
+        elif self.solve_kind == "ac3":
+            self._finish_ac3(payload)
+        else:
+            self._finish_full_solve(payload)
+
+    def _finish_generate(self, result):
+        self.current_board = result["board"]
+        self.original_board = self.current_board.getBoard()
+        for r in range(self.n):
+            for c in range(self.n):
+                self.last_assign_source[(r, c)] = "original" if self.original_board[r][c] != 0 else "user"
+        self.refresh_grid_from_board(self.current_board, mark_original=False)
+        self.log(f"Generated a new {self.n}x{self.n} puzzle in {result['elapsed']:.2f}s.")
+
+    def _finish_ac3(self, result):
+        self.render_process = result["render"]
+        elapsed = result["elapsed"]
+        if not result["success"]:
+            messagebox.showerror("AC-3 Result", "AC-3 detected inconsistency (no solution possible). See logs.")
+            self.log("AC-3: inconsistent (empty domain encountered).")
+            return
+        self.current_board = result["board"]
+        # mark new ac3 assignments
+        board = self.current_board.getBoard()
+        for r in range(self.n):
+            for c in range(self.n):
+                prev = self.original_board[r][c] if self.original_board else 0
+                val = board[r][c]
+                if prev == 0 and val != 0:
+                    self.last_assign_source[(r, c)] = "ac3"
+        self.refresh_grid_from_board(self.current_board, mark_original=False)
+        messagebox.showinfo("AC-3 Complete", f"AC-3 finished in {elapsed:.2f} seconds. See logs.")
+        self.log(f"Total revisions {result['revision']} and domains pruned {result['pruned']}")
+        self.log(f"Solve stats: {result['stats'].summary()}")
+        self.log(f"AC-3 finished in {elapsed:.2f}s.")
+
+    def _finish_full_solve(self, result):
+        self.render_process = result["render"]
+        elapsed = result["elapsed"]
+        if not result["success"]:
+            messagebox.showerror("Result", "AC-3 detected inconsistency first; no solution.")
+            self.log("AC-3 declared inconsistency; aborting full solve.")
+            return
+        solution = result["solution"]
+        if solution is None:
+            messagebox.showwarning("Full Solve", "AC-3 completed but the MAC search did not find a solution.")
+            self.log("Full Solve: MAC search returned None.")
             self.refresh_grid_from_board(self.current_board, mark_original=False)
-            self.log(f"Total revisions {revision} and domains pruned {pruned}")
-            elapsed_msg = f"Full solve finished in {elapsed:.2f} seconds."
-            messagebox.showinfo("Full Solve", "Solved! " + elapsed_msg)
-            self.log("Full Solve: " + elapsed_msg)
-        except Exception as e:
-            traceback.print_exc()
-            messagebox.showerror("Full Solve Error", str(e))
+            return
+        # apply solution and mark MAC assignments
+        after_ac = result["after_ac"]
+        solved = solution.getBoard()
+        for r in range(self.n):
+            for c in range(self.n):
+                orig = self.original_board[r][c] if self.original_board else 0
+                solved_val = solved[r][c]
+                if orig == 0 and solved_val != 0 and after_ac[r][c] != solved_val:
+                    self.last_assign_source[(r, c)] = "mac"
+                self.current_board.addNum(r, c, solved_val)
+        self.refresh_grid_from_board(self.current_board, mark_original=False)
+        self.log(f"Total revisions {result['revision']} and domains pruned {result['pruned']}")
+        self.log(f"Solve stats: {result['stats'].summary()}")
+        elapsed_msg = f"Full solve finished in {elapsed:.2f} seconds."
+        messagebox.showinfo("Full Solve", "Solved! " + elapsed_msg)
+        self.log("Full Solve: " + elapsed_msg)
 
     # ---------- Logging ----------
     def log(self, text):
@@ -447,7 +644,17 @@ class SudokuGUI(tk.Tk):
 
     def on_show_graph(self):
         try:
-            path = "ac3_tree.pdf"
+            process = self.render_process
+            if process is None:
+                path = TREE_PATH
+            elif process.poll() is None:
+                messagebox.showinfo("Arc Consistency Tree", "The PDF is still rendering, try again shortly.")
+                return
+            elif process.returncode != 0:
+                path = TREE_PATH
+                self.log("Graphviz could not render the tree; the DOT file is kept.")
+            else:
+                path = TREE_PATH[:-len(".dot")] + ".pdf"
 
             messagebox.showinfo("Arc Consistency Tree", f"Graph saved as:\n{path}")
             self.log(f"Arc Consistency Tree: {path}")
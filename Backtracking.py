@@ -1,54 +1,234 @@
-import Environment as env
+import ArcConsistency as ac
+import Domains as dom
+import SearchTree as st
+import SolveStats
 import random
 
-def backtrackingSearch(csp, root = None, Randomize = False):
-    return backtracking(csp, csp, Randomize, root)
+# Variable ordering: "first" = first empty cell in row-major order,
+# "mrv" = minimum remaining values, ties broken by degree (most empty peers)
+VAR_ORDERS = ("first", "mrv")
+# Value ordering: "natural" = increasing values,
+# "lcv" = least constraining value first
+VAL_ORDERS = ("natural", "lcv")
+# Nodes between two calls of a search's progress callback
+PROGRESS_EVERY = 256
 
-def backtracking(assignment, csp, Randomize, root = None):
-    #1- Valid sudoku
-    if assignment.isFilled():
-        return assignment
-    
-    #2- Get first unassigned place
-    rowIndex, colIndex = csp.getUnassigned()
+class SearchLimitReached(Exception):
+    """
+    Raised when a search tries more values than its node limit allows
+    The board is left partially assigned
+    """
+
+class SearchCancelled(Exception):
+    """
+    Raised by a progress callback or tracer to stop a search early
+    The board is left partially assigned
+    """
 
-    #3- Generate domain (copy)
-    domain = set(env.DOMAIN)
+def backtrackingSearch(csp, root = None, Randomize = False, domains = None,
+                       varOrder = "first", valOrder = "natural", stats = None,
+                       nodeLimit = None, progress = None):
+    """
+    domains: optional DomainStore (e.g. pruned by AC-3) that restricts
+    the values tried for every cell
+    varOrder / valOrder: one of VAR_ORDERS / VAL_ORDERS
+    stats: optional dict, "nodes" (values tried) and "backtracks" are added to
+    it, "max_depth" raised to the deepest level reached
+    nodeLimit: optional number of nodes after which SearchLimitReached is raised
+    root: optional TreeNode, TreeRecorder or TreeBranch to record the search
+    tree under (see SearchTree)
+    progress: optional callable, gets a dict of the "nodes" and "backtracks"
+    so far every PROGRESS_EVERY nodes; it may raise (e.g. SearchCancelled)
+    to stop the search
+    """
+    if varOrder not in VAR_ORDERS:
+        raise ValueError(f"Unknown variable ordering: {varOrder}")
+    if valOrder not in VAL_ORDERS:
+        raise ValueError(f"Unknown value ordering: {valOrder}")
+    if stats is None and nodeLimit is not None:
+        stats = {}
+    if stats is not None:
+        stats.setdefault("nodes", 0)
+        stats.setdefault("backtracks", 0)
+        stats.setdefault("max_depth", 0)
+    return backtracking(csp, csp, Randomize, root, domains, varOrder, valOrder, stats, nodeLimit,
+                        progress)
 
-    #Remove row numbers
-    domain -= set(csp.getRow(rowIndex))
+def cellDomain(csp, r, c, domains = None):
+    """
+    Bitmask of the values still possible for (r, c)
+    """
+    mask = csp.candidates(r, c)
+    if domains is not None:
+        mask &= domains.masks[r * csp.n + c]
+    return mask
 
-    #Remove column numbers
-    domain -= set(csp.getCol(colIndex))
+def selectMRV(csp, domains = None):
+    """
+    Empty cell with the fewest remaining values
+    Ties go to the cell with most empty peers, then to row-major order
+    """
+    peers = ac.getPeerIndex(csp.n, csp.s)[0]
+    cells = csp.cells
+    best = None
+    bestKey = None
+    for r, c in csp.empty:
+        size = dom.popcount(cellDomain(csp, r, c, domains))
+        if bestKey is not None and size > bestKey[0]:
+            continue
+        degree = 0
+        for j in peers[r * csp.n + c]:
+            if cells[j] == 0:
+                degree += 1
+        key = (size, -degree, r, c)
+        if bestKey is None or key < bestKey:
+            best, bestKey = (r, c), key
+            if size == 0: #dead end, no need to look further
+                break
+    return best
 
-    #Remove square numbers
-    domain -= set(csp.getSquare(rowIndex // 3, colIndex // 3))
+def orderLCV(csp, r, c, values, domains = None):
+    """
+    Sorts values so the one ruling out the fewest options
+    in the empty peers of (r, c) comes first
+    """
+    cells = csp.cells
+    peerMasks = [cellDomain(csp, pr, pc, domains)
+                 for pr, pc in ac.getPeerTable(csp.n, csp.s)[0][(r, c)] if cells[pr * csp.n + pc] == 0]
+    def ruledOut(val):
+        bit = dom.bit(val)
+        return sum(1 for mask in peerMasks if mask & bit)
+    return sorted(values, key = ruledOut)
 
-    domain = list(domain)
+def chooseCell(csp, Randomize, domains, varOrder, valOrder):
+    """
+    Next cell to branch on and the values to try there, in order
+    """
+    if varOrder == "mrv":
+        rowIndex, colIndex = selectMRV(csp, domains)
+    else:
+        rowIndex, colIndex = csp.getUnassigned()
+
+    #Generate domain as a bitmask (row, column and square numbers removed)
+    domain = dom.maskValues(cellDomain(csp, rowIndex, colIndex, domains))
 
     #Check for randomization
     if Randomize:
         random.shuffle(domain)
 
-    #4- Try all domain values
-    for val in domain:
-        assignment.addNum(rowIndex, colIndex, val)
-        if root is not None:
-            node = env.TreeNode(((rowIndex,colIndex) , val))
-            root.add_child(node)
-            result = backtracking(assignment, csp, Randomize, node)
+    if valOrder == "lcv":
+        domain = orderLCV(csp, rowIndex, colIndex, domain, domains)
+    return rowIndex, colIndex, domain
+
+def backtracking(assignment, csp, Randomize, root = None, domains = None,
+                 varOrder = "first", valOrder = "natural", stats = None, nodeLimit = None,
+                 progress = None):
+    """
+    Depth-first search with an explicit stack instead of recursion
+    Each frame is [row, col, values still to try, parent node, current node]
+    and stands for one level of the recursive search. Values still to try are
+    a bitmask in increasing order, or a reversed list when the order is
+    shuffled or LCV
+    """
+    #1- Valid sudoku
+    if assignment.isFilled():
+        return assignment
+
+    tree, top = st.recorderFor(root)
+    useMask = not Randomize and valOrder == "natural"
+    mrv = varOrder == "mrv"
+    addNum = assignment.addNum
+    empty = assignment.empty
+    nodes = backtracks = depth = 0
+    baseNodes = stats["nodes"] if stats is not None else 0
+    baseBacktracks = stats["backtracks"] if stats is not None else 0
+    budget = None
+    if nodeLimit is not None:
+        budget = nodeLimit - baseNodes
+
+    # Row-major order fills the initially empty cells one after the other,
+    # so the cell of every depth is known up front
+    cells = None
+    if useMask and not mrv:
+        s = csp.s
+        cells = [(r, c, r // s * s + c // s) for r, c in sorted(empty)]
+        rowUsed, colUsed, boxUsed = csp.rowUsed, csp.colUsed, csp.boxUsed
+        full = dom.fullMask(csp.n)
+
+    def newFrame(parent):
+        #2- Next unassigned place and its domain
+        if not useMask:
+            rowIndex, colIndex, domain = chooseCell(csp, Randomize, domains, varOrder, valOrder)
+            domain.reverse()
+            return [rowIndex, colIndex, domain, parent, None]
+        if mrv:
+            rowIndex, colIndex = selectMRV(csp, domains)
+        else:
+            rowIndex, colIndex = csp.getUnassigned()
+        mask = csp.candidates(rowIndex, colIndex)
+        if domains is not None:
+            mask &= domains.masks[rowIndex * csp.n + colIndex]
+        return [rowIndex, colIndex, mask, parent, None]
+
+    stack = [newFrame(top)]
+    assigned = False #does the top frame hold a value on the board
+
+    try:
+        while stack:
+            frame = stack[-1]
+
+            #Undo the value that failed below this frame
+            if assigned:
+                addNum(frame[0], frame[1], 0)
+                backtracks += 1
+                if tree is not None:
+                    tree.fail(frame[4])
+
+            #3- Every value failed: back to the previous level
+            remaining = frame[2]
+            if not remaining:
+                stack.pop()
+                assigned = True
+                continue
 
-        else : 
-            result = backtracking(assignment, csp, Randomize)
+            #4- Try the next value
+            if useMask:
+                low = remaining & -remaining
+                frame[2] = remaining ^ low
+                val = low.bit_length()
+            else:
+                val = remaining.pop()
+            addNum(frame[0], frame[1], val)
+            assigned = True
+            nodes += 1
+            if len(stack) > depth:
+                depth = len(stack)
+            if budget is not None and nodes > budget:
+                raise SearchLimitReached(nodeLimit)
+            if progress is not None and nodes % PROGRESS_EVERY == 0:
+                progress({"nodes": baseNodes + nodes, "backtracks": baseBacktracks + backtracks})
+            node = None
+            if tree is not None:
+                node = tree.add(frame[3], ((frame[0], frame[1]), val))
+                frame[4] = node
 
-        if result is not None:
-            return result
+            if not empty:
+                return assignment
 
-        #Undo assignment
-        assignment.addNum(rowIndex, colIndex, 0)
-        #Remove all children and detect failure
-        if root is not None:
-            node.remove_children()
-            node.detect_fail()
+            #5- Go one level deeper
+            if cells is not None:
+                rowIndex, colIndex, box = cells[len(stack)]
+                mask = full & ~(rowUsed[rowIndex] | colUsed[colIndex] | boxUsed[box])
+                if domains is not None:
+                    mask &= domains.masks[rowIndex * csp.n + colIndex]
+                stack.append([rowIndex, colIndex, mask, node, None])
+            else:
+                stack.append(newFrame(node))
+            assigned = False
 
-    return None
\ No newline at end of file
+        return None
+    finally:
+        if stats is not None:
+            stats["nodes"] += nodes
+            stats["backtracks"] += backtracks
+            SolveStats.noteDepth(stats, depth)
@@ -0,0 +1,340 @@
+"""
+Batch solver: streams puzzles from a file (one n*n-character line each, for
+n = 4, 9, 16 or 25: digits then A-P for givens and 0 or '.' for empty
+cells), solves them with a chosen engine and writes one CSV or JSONL record
+per puzzle.
+
+    python Batch.py puzzles.txt -o solutions.csv --engine mac
+    python Batch.py puzzles.txt -o solutions.jsonl --workers 8 --chunk-size 64
+    python Batch.py puzzles.txt --cache 100000 --cache-file solve-cache.jsonl
+    python Batch.py puzzles.txt --vectorized --chunk-size 4096
+    python Batch.py puzzles.txt --profile batch.prof   (or SUDOKU_PROFILE=batch.prof)
+"""
+import Creation
+import SolveCache
+import SolveStats
+import Solvers
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
+
+FIELDS = ["index", "puzzle", "solution", "status", "nodes", "backtracks", "max_depth",
+          "revisions", "prunings", "init_seconds", "propagation_seconds", "search_seconds",
+          "seconds", "cached"]
+# Record fields copied from the SolveStats of a solve
+STATS_FIELDS = ("nodes", "backtracks", "max_depth", "revisions", "prunings",
+                "init_seconds", "propagation_seconds", "search_seconds")
+FORMATS = ("csv", "jsonl")
+
+def readPuzzles(lines):
+    """
+    Yields the puzzle lines of an iterable (file), skipping blanks and # comments
+    Nothing is read ahead, so files of any size stream through
+    """
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+def newRecord(index, line):
+    return {"index": index, "puzzle": line, "solution": "", "status": "",
+            "nodes": 0, "backtracks": 0, "max_depth": 0, "revisions": 0, "prunings": 0,
+            "init_seconds": 0.0, "propagation_seconds": 0.0, "search_seconds": 0.0,
+            "seconds": 0.0, "cached": False}
+
+def solveLine(index, line, engine, nodeLimit = None, cache = None):
+    """
+    Solves one puzzle line with the named engine and returns its record
+    Status is "solved", "unsolvable", "invalid" (bad line) or "limit"
+    (nodeLimit reached)
+    cache: optional SolveCache.SolveCache looked up first and filled after
+    solving; "cached" tells whether the record came from it
+    """
+    record = newRecord(index, line)
+    try:
+        board = Creation.boardFromLine(line)
+    except ValueError:
+        record["status"] = "invalid"
+        return record
+    if cache is not None:
+        cacheKey = cache.key(line)
+        if cachedRecord(record, cache, cacheKey):
+            return record
+    stats = SolveStats.SolveStats()
+    start = time.perf_counter()
+    try:
+        solution = Solvers.solve(board, engine, nodeLimit, stats)[0]
+    except Solvers.SearchLimitReached:
+        solution = None
+        record["status"] = "limit"
+    record["seconds"] = time.perf_counter() - start
+    for key in STATS_FIELDS:
+        record[key] = stats[key]
+    if solution is not None:
+        record["status"] = "solved"
+        record["solution"] = Creation.boardToLine(solution)
+    elif not record["status"]:
+        record["status"] = "unsolvable"
+    if cache is not None:
+        storeRecord(record, cache, cacheKey)
+    return record
+
+def cachedRecord(record, cache, key):
+    """
+    Fills record from the cache, returns False on a miss
+    """
+    start = time.perf_counter()
+    found, solution = cache.lookup(record["puzzle"], key)
+    if not found:
+        return False
+    record["status"] = "unsolvable" if solution is None else "solved"
+    record["solution"] = solution or ""
+    record["cached"] = True
+    record["seconds"] = time.perf_counter() - start
+    return True
+
+def storeRecord(record, cache, key = None):
+    """
+    Adds a solved or unsolvable record to the cache
+    """
+    if record["status"] in ("solved", "unsolvable"):
+        cache.store(record["puzzle"], record["solution"] or None, key)
+
+def solveLines(lines, engine = "mac", nodeLimit = None, cache = None):
+    """
+    Yields one record per puzzle line, in input order
+    """
+    Solvers.getEngine(engine) #fail early on a bad name
+    for index, line in enumerate(readPuzzles(lines)):
+        yield solveLine(index, line, engine, nodeLimit, cache)
+
+def chunked(items, size):
+    """
+    Yields lists of up to size consecutive items
+    """
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+# SolveStats.Profiler of a worker process, see startWorkerProfiler
+_workerProfiler = None
+
+def startWorkerProfiler(path):
+    """
+    Pool initializer: profiles the chunks a worker solves into path.<pid>
+    """
+    global _workerProfiler
+    _workerProfiler = SolveStats.Profiler(f"{path}.{os.getpid()}")
+
+def solveChunk(chunk, engine, nodeLimit = None):
+    """
+    Solves a list of (index, line) pairs, runs inside a worker process
+    """
+    with _workerProfiler or nullcontext():
+        return [solveLine(index, line, engine, nodeLimit) for index, line in chunk]
+
+def solveLinesParallel(lines, engine = "mac", workers = None, chunksize = 64, nodeLimit = None,
+                       cache = None, profile = None):
+    """
+    Same records as solveLines, solved by a pool of worker processes
+    Puzzles go out in chunks of chunksize; at most 2 chunks per worker are
+    in flight, so memory stays bounded for any input size, and records are
+    yielded in input order
+    workers: number of processes (default: all CPUs)
+    cache: optional SolveCache.SolveCache, used by this process only: hits
+    are not sent to the workers and solved records are stored as they come
+    back
+    profile: optional file name, every worker writes its cProfile to
+    profile.<pid>
+    """
+    Solvers.getEngine(engine)
+    workers = workers or os.cpu_count() or 1
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+    if workers == 1:
+        yield from solveLines(lines, engine, nodeLimit, cache)
+        return
+    chunks = chunked(enumerate(readPuzzles(lines)), chunksize)
+    initializer, initargs = (startWorkerProfiler, (profile,)) if profile else (None, ())
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer,
+                             initargs=initargs) as pool:
+        pending = deque()
+        for chunk in chunks:
+            hits = []
+            if cache is not None:
+                chunk, hits = splitCached(chunk, cache)
+            future = pool.submit(solveChunk, chunk, engine, nodeLimit) if chunk else None
+            pending.append((future, hits))
+            if len(pending) >= 2 * workers:
+                yield from mergeChunk(*pending.popleft(), cache)
+        while pending:
+            yield from mergeChunk(*pending.popleft(), cache)
+
+def solveLinesVectorized(lines, engine = "mac", chunksize = 4096, nodeLimit = None):
+    """
+    Same records as solveLines, chunksize puzzles at a time go through
+    VectorPropagation (numpy) first and only the boards it leaves open are
+    searched, from their propagated state; the counters of a record are
+    those of that search and its seconds include its share of the
+    propagation
+    """
+    import VectorPropagation as vp
+    Solvers.getEngine(engine)
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+    for chunk in chunked(enumerate(readPuzzles(lines)), chunksize):
+        try:
+            boards = vp.loadBoards([line for _, line in chunk])
+        except ValueError:
+            #bad or mixed-size lines: solve the chunk one puzzle at a time
+            for index, line in chunk:
+                yield solveLine(index, line, engine, nodeLimit)
+            continue
+        start = time.perf_counter()
+        boards, status = vp.propagateBoards(boards)
+        share = (time.perf_counter() - start) / len(chunk)
+        for (index, line), propagated, state in zip(chunk, vp.boardLines(boards), status):
+            if state == vp.OPEN:
+                record = solveLine(index, propagated, engine, nodeLimit)
+                record["puzzle"] = line
+            else:
+                record = newRecord(index, line)
+                record["status"] = "solved" if state == vp.SOLVED else "unsolvable"
+                record["solution"] = propagated if state == vp.SOLVED else ""
+            record["seconds"] += share
+            yield record
+
+def splitCached(chunk, cache):
+    """
+    (pairs still to solve, records found in the cache) of a chunk
+    """
+    todo = []
+    hits = []
+    for index, line in chunk:
+        record = newRecord(index, line)
+        try:
+            key = cache.key(line)
+        except ValueError:
+            todo.append((index, line)) #invalid, the worker reports it
+            continue
+        if cachedRecord(record, cache, key):
+            hits.append(record)
+        else:
+            todo.append((index, line))
+    return todo, hits
+
+def mergeChunk(future, hits, cache):
+    """
+    Records of a chunk in input order, storing the solved ones in the cache
+    """
+    solved = future.result() if future is not None else []
+    if cache is not None:
+        for record in solved:
+            storeRecord(record, cache)
+    return sorted(solved + hits, key=lambda record: record["index"])
+
+def writeResults(records, out, fmt):
+    """
+    Writes records to the open file out as CSV or JSONL
+    Returns the number of records written
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt}")
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=FIELDS)
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+            count += 1
+    else:
+        for record in records:
+            out.write(json.dumps(record) + "\n")
+            count += 1
+    return count
+
+def parseArgs(argv = None):
+    parser = argparse.ArgumentParser(description="Solve a file of Sudoku puzzles")
+    parser.add_argument("input", help="puzzle file, one puzzle per line ('-' for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="output file ('-' for stdout)")
+    parser.add_argument("--engine", default="mac", choices=sorted(Solvers.ENGINES))
+    parser.add_argument("--format", choices=FORMATS,
+                        help="output format (default: from the output extension, else csv)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes (0 = all CPUs, default 1)")
+    parser.add_argument("--chunk-size", type=int,
+                        help="puzzles sent to a worker at a time (default 64), or propagated "
+                             "together with --vectorized (default 4096)")
+    parser.add_argument("--node-limit", type=int,
+                        help="give up on a puzzle after this many search nodes")
+    parser.add_argument("--cache", type=int, default=0,
+                        help="solve cache entries, isomorphic puzzles share one (0 = no cache)")
+    parser.add_argument("--cache-file",
+                        help="JSONL file the cache is loaded from and saved to")
+    parser.add_argument("--vectorized", action="store_true",
+                        help="propagate singles over whole chunks with numpy before searching "
+                             "(one process, no cache)")
+    parser.add_argument("--profile", default=SolveStats.profilePath(),
+                        help="write a cProfile of the run to this file (worker processes to "
+                             f"<file>.<pid>); default: ${SolveStats.PROFILE_ENV}")
+    args = parser.parse_args(argv)
+    if args.vectorized and (args.workers != 1 or args.cache or args.cache_file):
+        parser.error("--vectorized runs in one process without a cache")
+    if args.chunk_size is None:
+        args.chunk_size = 4096 if args.vectorized else 64
+    if args.format is None:
+        args.format = "jsonl" if args.output.endswith((".jsonl", ".json")) else "csv"
+    return args
+
+def openFiles(args):
+    source = sys.stdin if args.input == "-" else open(args.input, "r")
+    target = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+    return source, target
+
+def main(argv = None):
+    args = parseArgs(argv)
+    source, target = openFiles(args)
+    cache = None
+    if args.cache or args.cache_file:
+        cache = SolveCache.SolveCache(args.cache or 10000, args.cache_file)
+    profiler = SolveStats.Profiler(args.profile) if args.profile else None
+    try:
+        start = time.perf_counter()
+        if args.vectorized:
+            records = solveLinesVectorized(source, args.engine, args.chunk_size, args.node_limit)
+        else:
+            records = solveLinesParallel(source, args.engine, args.workers, args.chunk_size,
+                                         args.node_limit, cache, args.profile)
+        with profiler or nullcontext():
+            count = writeResults(records, target, args.format)
+        elapsed = time.perf_counter() - start
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"{count} puzzles in {elapsed:.3f}s ({rate:,.1f} puzzles/s, engine {args.engine}, "
+          f"{args.workers or os.cpu_count()} workers)", file=sys.stderr)
+    if profiler is not None:
+        print(f"profile written to {args.profile}"
+              + (f" (workers: {args.profile}.<pid>)" if args.workers != 1 else ""), file=sys.stderr)
+    if cache is not None:
+        if cache.path is not None:
+            cache.save()
+        info = cache.stats()
+        print(f"cache: {info['hits']} hits, {info['misses']} misses ({info['hit_rate']:.1%}), "
+              f"{info['entries']} entries", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,781 @@
+"""
+Benchmarks for the Sudoku CSP solvers
+
+    python Benchmark.py suite                   every engine on puzzles/*.txt, JSON report
+    python Benchmark.py compare old.json new.json
+    python Benchmark.py corpus                  regenerate puzzles/*.txt
+    python Benchmark.py arcs | ordering | propagation | rules | scaling | uniqueness | gridsize | cache
+    python Benchmark.py consistency             AC-3 vs AC-2001 checks and time
+    python Benchmark.py vector                  numpy batch propagation (needs numpy)
+"""
+import Environment as env
+import Creation
+import ArcConsistency as ac
+import DancingLinks as dlx
+import Backtracking as bk
+import Domains as dom
+import Generator
+import Propagation
+import SolveAC as ACS
+import SolveCache
+import SolveMAC as mac
+import Solvers
+import Symmetry
+import Tracing as tr
+import Batch
+import os
+import argparse
+import datetime
+import json
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+
+# Checked-in puzzle sets, regenerated by "Benchmark.py corpus"
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "puzzles")
+BUCKETS = ("easy", "hard", "17clue", "adversarial")
+
+# Known 17-clue puzzles with a unique solution, the 17clue and adversarial
+# buckets are random symmetric variants of these
+SEEDS_17 = (
+    "000000010400000000020000000000050407008000300001090000300400200050100000000806000",
+    "000000000000003085001020000000507000004000100090000000500000073002010000000040009",
+    "000000012000035000000600070700000300000400800100000000000120000080000040050000600",
+)
+
+def makePuzzles(count, seed, removed = 50):
+    """
+    Generates a reproducible list of puzzles using Creation.generateRandom
+    """
+    state = random.getstate()
+    random.seed(seed)
+    puzzles = []
+    for _ in range(count):
+        game = env.sudoku()
+        Creation.generateRandom(game, removed)
+        puzzles.append(game)
+    random.setstate(state)
+    return puzzles
+
+def solveLine(line):
+    """
+    Solution line of a puzzle line (MAC search)
+    """
+    solution = mac.macSearch(Creation.boardFromLine(line))
+    if solution is None:
+        raise ValueError(f"Puzzle has no solution: {line}")
+    return Creation.boardToLine(solution)
+
+def makeAdversarial(line):
+    """
+    Variant of a puzzle that is as slow as possible for row-major,
+    increasing-value backtracking: the emptiest row is moved to the top and
+    digits are relabelled so its missing values are 9, 8, 7, ... in order
+    """
+    n, s = env.N, env.S
+    values = Symmetry.lineValues(line)
+    best = None
+    for transpose in (False, True):
+        for row in range(n):
+            if transpose:
+                clues = sum(1 for c in range(n) if values[c * n + row])
+            else:
+                clues = sum(1 for c in range(n) if values[row * n + c])
+            if best is None or clues < best[0]:
+                best = (clues, transpose, row)
+    clues, transpose, row = best
+    band = row // s
+    bands = [band] + [b for b in range(n // s) if b != band]
+    rows = []
+    for b in bands:
+        inner = [b * s + i for i in range(s)]
+        if b == band:
+            inner.remove(row)
+            inner.insert(0, row)
+        rows.extend(inner)
+    moved = Symmetry.applyTransform(line, (transpose, rows, list(range(n)), list(range(n + 1))))
+    solution = Symmetry.lineValues(solveLine(moved))
+    digits = [0] * (n + 1)
+    label = n
+    # empty cells of the top row first, then the rest of the grid
+    order = [i for i in range(n) if moved[i] == "0"] + list(range(n * n))
+    for i in order:
+        v = solution[i]
+        if digits[v] == 0:
+            digits[v] = label
+            label -= 1
+    return Symmetry.applyTransform(moved, identityDigits(n, digits))
+
+def identityDigits(n, digits):
+    return (False, list(range(n)), list(range(n)), digits)
+
+def makeCorpus(seed):
+    """
+    Builds every bucket from seed, returns {bucket: [puzzle lines]}
+    - easy: 45 random blanks
+    - hard: the 50 slowest (MAC nodes) of 200 Generator puzzles, every one
+      with a unique solution
+    - 17clue: random symmetric variants of SEEDS_17 (unique solutions)
+    - adversarial: makeAdversarial of 17-clue variants
+    """
+    rng = random.Random(seed)
+    corpus = {}
+    corpus["easy"] = [Creation.boardToLine(g) for g in makePuzzles(50, rng.randrange(1 << 30), 45)]
+
+    candidates = []
+    for record in Generator.generatePuzzles(200, rng.randrange(1 << 30), workers=0):
+        line = record["puzzle"]
+        stats = {}
+        mac.macSearch(Creation.boardFromLine(line), stats=stats)
+        candidates.append((stats["nodes"], line))
+    candidates.sort(key=lambda item: -item[0])
+    corpus["hard"] = [line for nodes, line in candidates[:50]]
+
+    corpus["17clue"] = [Symmetry.applyTransform(SEEDS_17[i % len(SEEDS_17)], Symmetry.randomTransform(rng))
+                        for i in range(30)]
+    corpus["adversarial"] = [makeAdversarial(line) for line in corpus["17clue"][:10]]
+    return corpus
+
+def writeCorpus(corpus, seed, directory = CORPUS_DIR):
+    os.makedirs(directory, exist_ok=True)
+    for bucket, lines in corpus.items():
+        with open(os.path.join(directory, bucket + ".txt"), "w") as f:
+            f.write(f"# {bucket}: {len(lines)} puzzles, generated by Benchmark.py corpus --seed {seed}\n")
+            for line in lines:
+                f.write(line + "\n")
+
+def loadBucket(bucket, directory = CORPUS_DIR):
+    with open(os.path.join(directory, bucket + ".txt"), "r") as f:
+        return list(Batch.readPuzzles(f))
+
+def percentile(values, q):
+    """
+    Nearest-rank percentile of a sorted list (None when empty)
+    """
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * q // 100))
+    return values[int(rank) - 1]
+
+def benchEngine(engine, lines, nodeLimit = None, memorySample = 5):
+    """
+    Solves every line with one engine and summarizes the run
+    Latency percentiles only cover the puzzles that finished;
+    peak memory is measured in a second, traced pass over the first
+    memorySample puzzles (tracemalloc slows the solvers down a lot)
+    """
+    solve = Solvers.getEngine(engine)
+    latencies = []
+    totals = {"nodes": 0, "backtracks": 0, "revisions": 0, "prunings": 0}
+    solved = unsolvable = limited = 0
+    for line in lines:
+        stats = {}
+        board = Creation.boardFromLine(line)
+        start = time.perf_counter()
+        try:
+            solution = solve(board, stats, nodeLimit)
+        except Solvers.SearchLimitReached:
+            limited += 1
+            solution = None
+        else:
+            latencies.append(time.perf_counter() - start)
+            if solution is None:
+                unsolvable += 1
+            else:
+                solved += 1
+        for key in totals:
+            totals[key] += stats.get(key, 0)
+
+    peak = None
+    if memorySample:
+        peak = 0
+        for line in lines[:memorySample]:
+            board = Creation.boardFromLine(line)
+            tracemalloc.start()
+            try:
+                solve(board, {}, nodeLimit)
+            except Solvers.SearchLimitReached:
+                pass
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+    latencies.sort()
+    count = len(lines)
+    result = {
+        "puzzles": count,
+        "solved": solved,
+        "unsolvable": unsolvable,
+        "limit": limited,
+        "p50_ms": None, "p90_ms": None, "p99_ms": None, "max_ms": None,
+        "peak_memory_kib": None if peak is None else round(peak / 1024, 1),
+    }
+    for name, q in (("p50_ms", 50), ("p90_ms", 90), ("p99_ms", 99), ("max_ms", 100)):
+        value = percentile(latencies, q)
+        if value is not None:
+            result[name] = round(value * 1000, 3)
+    for key, total in totals.items():
+        result[key] = total
+        result["mean_" + key] = round(total / count, 1) if count else 0
+    return result
+
+def gitCommit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def benchSuite(engines, buckets, nodeLimit, memorySample):
+    """
+    Runs every engine on every bucket, returns the JSON-ready report
+    """
+    report = {
+        "meta": {
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": gitCommit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "node_limit": nodeLimit,
+            "memory_sample": memorySample,
+        },
+        "results": {},
+    }
+    for engine in engines:
+        report["results"][engine] = {}
+        for bucket in buckets:
+            report["results"][engine][bucket] = benchEngine(engine, loadBucket(bucket), nodeLimit, memorySample)
+    return report
+
+def benchArcs(puzzles, repeat, tracer = None):
+    """
+    Runs AC-3 on every puzzle and returns (arcs processed, seconds)
+    tracer: optional AC-3 tracer, to measure the cost of logging
+    """
+    arcs = 0
+    elapsed = 0.0
+    for _ in range(repeat):
+        for game in puzzles:
+            start = time.perf_counter()
+            success, revision, pruning = ac.AC3(game, tracer)
+            elapsed += time.perf_counter() - start
+            arcs += revision
+    return arcs, elapsed
+
+def legacyNeighbours(cell):
+    """
+    Neighbour set built from scratch, as get_neighbours did before the peer table
+    """
+    neighbours = set()
+    neighbours.update(ac.get_row_neighbours(cell))
+    neighbours.update(ac.get_col_neighbours(cell))
+    neighbours.update(ac.get_square_neighbours(cell))
+    return neighbours
+
+def benchNeighbours(repeat):
+    """
+    Walks every arc of the grid through both neighbour lookups
+    Returns {name: arcs per second}
+    """
+    cells = [(r, c) for r in range(env.N) for c in range(env.N)]
+    peers = ac.getPeerTable()[0]
+    lookups = {"rebuilt sets": legacyNeighbours, "peer table": peers.__getitem__}
+    rates = {}
+    for name, lookup in lookups.items():
+        arcs = 0
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for Xi in cells:
+                for Xj in lookup(Xi):
+                    arcs += 1
+        rates[name] = arcs / (time.perf_counter() - start)
+    return rates
+
+def benchOrdering(puzzles):
+    """
+    Solves every puzzle with each variable/value ordering of backtrackingSearch
+    Returns {(varOrder, valOrder): (nodes, seconds)}
+    """
+    results = {}
+    for varOrder in bk.VAR_ORDERS:
+        for valOrder in bk.VAL_ORDERS:
+            stats = {}
+            start = time.perf_counter()
+            for game in puzzles:
+                board = Creation.copyBoard(game)
+                if bk.backtrackingSearch(board, varOrder=varOrder, valOrder=valOrder, stats=stats) is None:
+                    raise RuntimeError("Benchmark puzzle has no solution")
+            results[(varOrder, valOrder)] = (stats["nodes"], time.perf_counter() - start)
+    return results
+
+def benchPropagation(puzzles):
+    """
+    Solves every puzzle with each propagation mode of macSearch
+    Returns {propagation: (stats, seconds)}
+    """
+    results = {}
+    for propagation in mac.PROPAGATIONS:
+        stats = {}
+        start = time.perf_counter()
+        for game in puzzles:
+            board = Creation.copyBoard(game)
+            if mac.macSearch(board, propagation=propagation, stats=stats) is None:
+                raise RuntimeError("Benchmark puzzle has no solution")
+        results[propagation] = (stats, time.perf_counter() - start)
+    return results
+
+def benchConsistency(lines, algorithms):
+    """
+    enforceArcConsistency with every arc consistency algorithm on the same lines
+    Returns {algorithm: (revisions, prunings, checks, seconds, end states)},
+    the end states (success, board line) must agree between algorithms
+    """
+    results = {}
+    for algorithm in algorithms:
+        stats = {}
+        revisions = prunings = 0
+        states = []
+        start = time.perf_counter()
+        for line in lines:
+            board = Creation.boardFromLine(line)
+            success, revision, pruning = ACS.enforceArcConsistency(board, stats=stats,
+                                                                   algorithm=algorithm)
+            revisions += revision
+            prunings += pruning
+            states.append((success, Creation.boardToLine(board)))
+        results[algorithm] = (revisions, prunings, stats["checks"], time.perf_counter() - start,
+                              states)
+    return results
+
+def ruleSets():
+    """
+    Rule sets compared by benchRules: none, each rule alone, the default
+    rules and every rule
+    """
+    sets = {"none": ()}
+    for rule in Propagation.RULES:
+        sets[rule] = (rule,)
+    sets["default"] = Propagation.DEFAULT_RULES
+    sets["all"] = Propagation.RULES
+    return sets
+
+def benchRules(lines, nodeLimit):
+    """
+    MAC search on every puzzle line with each rule set of ruleSets()
+    Returns {name: (stats, solved, seconds)}
+    """
+    results = {}
+    for name, rules in ruleSets().items():
+        stats = {}
+        solved = 0
+        start = time.perf_counter()
+        for line in lines:
+            try:
+                solved += mac.macSearch(Creation.boardFromLine(line), stats=stats,
+                                        nodeLimit=None if nodeLimit is None else stats.get("nodes", 0) + nodeLimit,
+                                        rules=rules) is not None
+            except bk.SearchLimitReached:
+                pass
+        results[name] = (stats, solved, time.perf_counter() - start)
+    return results
+
+def uniquenessChecks(records, seed):
+    """
+    The checks a generator makes while digging, as (values, cell, removed
+    value): each generated puzzle gets a random half of its missing cells
+    back from the solution (a board halfway through digging, still unique),
+    then every one of its clues is removed in turn
+    """
+    rng = random.Random(seed)
+    checks = []
+    for record in records:
+        values = [solved if given or rng.random() < 0.5 else 0
+                  for given, solved in zip(Symmetry.lineValues(record["puzzle"]),
+                                           Symmetry.lineValues(record["solution"]))]
+        for cell, value in enumerate(values):
+            if value:
+                dug = list(values)
+                dug[cell] = 0
+                checks.append((dug, cell, value))
+    return checks
+
+def benchUniqueness(checks):
+    """
+    Answers every check in several ways: counting up to 2 solutions
+    (SolveMAC.countSolutions with AC-3 or forward checking, or
+    DancingLinks.countSolutions), or looking for one solution that uses
+    another value in the dug cell (what Generator does)
+    Returns {mode: (unique count, stats, seconds)}
+    """
+    modes = {
+        "count<=2 ac3": lambda board, cell, value, stats:
+            mac.countSolutions(board, 2, "ac3", stats) == 1,
+        "count<=2 fc": lambda board, cell, value, stats:
+            mac.countSolutions(board, 2, "fc", stats) == 1,
+        "exclude ac3": lambda board, cell, value, stats:
+            mac.countSolutions(board, 1, "ac3", stats, excludeDomains(cell, value)) == 0,
+        "exclude fc": lambda board, cell, value, stats:
+            mac.countSolutions(board, 1, "fc", stats, excludeDomains(cell, value)) == 0,
+        "dlx count<=2": lambda board, cell, value, stats:
+            dlx.countSolutions(board, 2, stats) == 1,
+    }
+    results = {}
+    for name, check in modes.items():
+        stats = {}
+        unique = 0
+        start = time.perf_counter()
+        for values, cell, value in checks:
+            board = Creation.boardFromLine("".join(map(str, values)))
+            unique += check(board, cell, value, stats)
+        results[name] = (unique, stats, time.perf_counter() - start)
+    return results
+
+def excludeDomains(cell, value, n = None):
+    domains = dom.DomainStore(env.N if n is None else n)
+    domains.remove(cell, value)
+    return domains
+
+def cacheWorkload(lines, variants, seed):
+    """
+    variants random symmetric variants of every line, shuffled
+    """
+    rng = random.Random(seed)
+    workload = [Symmetry.applyTransform(line, Symmetry.randomTransform(rng))
+                for line in lines for _ in range(variants)]
+    rng.shuffle(workload)
+    return workload
+
+def benchCache(lines, engine, nodeLimit, cacheSize):
+    """
+    Solves every line with the engine, without and then through a
+    SolveCache of cacheSize entries
+    Returns {"engine" / "cached": (solved, seconds)} and the cache
+    """
+    solve = Solvers.getEngine(engine)
+    cache = SolveCache.SolveCache(cacheSize)
+    results = {}
+    for name in ("engine", "cached"):
+        solved = 0
+        start = time.perf_counter()
+        for line in lines:
+            board = Creation.boardFromLine(line)
+            try:
+                if name == "engine":
+                    solution = solve(board, {}, nodeLimit)
+                else:
+                    solution = cache.solve(board, engine, {}, nodeLimit)
+            except Solvers.SearchLimitReached:
+                solution = None
+            solved += solution is not None
+        results[name] = (solved, time.perf_counter() - start)
+    return results, cache
+
+def benchScaling(lines, engine, maxWorkers, chunksize):
+    """
+    Solves the same puzzle lines with 1..maxWorkers processes
+    Returns {workers: puzzles per second}
+    """
+    rates = {}
+    for workers in range(1, maxWorkers + 1):
+        start = time.perf_counter()
+        count = sum(1 for _ in Batch.solveLinesParallel(lines, engine, workers, chunksize))
+        rates[workers] = count / (time.perf_counter() - start)
+    return rates
+
+def benchVector(lines, engine, nodeLimit):
+    """
+    Solves every line with the engine one board at a time, then with
+    VectorPropagation.solveLines (all boards propagated together, the rest
+    searched by the engine)
+    Returns {"scalar" / "vectorized": (solved, seconds)} and the
+    vectorized stats
+    """
+    import VectorPropagation as vp
+    solve = Solvers.getEngine(engine)
+    results = {}
+    solved = 0
+    start = time.perf_counter()
+    for line in lines:
+        try:
+            solved += solve(Creation.boardFromLine(line), {}, nodeLimit) is not None
+        except Solvers.SearchLimitReached:
+            pass
+    results["scalar"] = (solved, time.perf_counter() - start)
+    stats = {}
+    start = time.perf_counter()
+    solutions = vp.solveLines(lines, engine, nodeLimit, stats)
+    results["vectorized"] = (sum(solution is not None for solution in solutions),
+                             time.perf_counter() - start)
+    return results, stats
+
+def patternLine(n):
+    """
+    A full n x n grid (s*s = n): row r is the first row shifted by s*(r%s) + r//s
+    """
+    s = env.squareSize(n)
+    return "".join(env.VALUE_CHARS[(s * (r % s) + r // s + c) % n + 1]
+                   for r in range(n) for c in range(n))
+
+def makeGridPuzzles(n, count, seed, blanks):
+    """
+    Reproducible n x n puzzles: random symmetric variants of patternLine(n)
+    with a fraction blanks of the cells emptied
+    """
+    rng = random.Random(seed)
+    s = env.squareSize(n)
+    full = patternLine(n)
+    lines = []
+    for _ in range(count):
+        cells = list(Symmetry.applyTransform(full, Symmetry.randomTransform(rng, n, s)))
+        for cell in rng.sample(range(n * n), int(n * n * blanks)):
+            cells[cell] = "0"
+        lines.append("".join(cells))
+    return lines
+
+def benchGridSizes(sizes, engines, count, seed, blanks, nodeLimit):
+    """
+    Every engine on the same share of empty cells for each grid size
+    Returns {(size, engine): benchEngine result}
+    """
+    results = {}
+    for n in sizes:
+        lines = makeGridPuzzles(n, count, seed, blanks)
+        for engine in engines:
+            results[(n, engine)] = benchEngine(engine, lines, nodeLimit, memorySample=0)
+    return results
+
+def runArcs(args):
+    puzzles = makePuzzles(args.puzzles, args.seed)
+    arcs, elapsed = benchArcs(puzzles, args.repeat)
+    print(f"AC-3: {arcs} arcs in {elapsed:.3f}s -> {arcs / elapsed:,.0f} arcs/s")
+    lines = []
+    arcs, elapsed = benchArcs(puzzles, args.repeat, tr.textTracer(lines.append))
+    print(f"AC-3 with text tracer: {arcs} arcs in {elapsed:.3f}s -> {arcs / elapsed:,.0f} arcs/s")
+    for name, rate in benchNeighbours(args.repeat * 100).items():
+        print(f"Neighbour walk ({name}): {rate:,.0f} arcs/s")
+
+def runOrdering(args):
+    puzzles = makePuzzles(args.puzzles, args.seed, args.removed)
+    print(f"{len(puzzles)} puzzles, {args.removed} empty cells each")
+    for (varOrder, valOrder), (nodes, elapsed) in benchOrdering(puzzles).items():
+        print(f"{varOrder:>6} + {valOrder:<8} nodes {nodes:>10,}  time {elapsed:8.3f}s")
+
+def runPropagation(args):
+    puzzles = makePuzzles(args.puzzles, args.seed, args.removed)
+    print(f"{len(puzzles)} puzzles, {args.removed} empty cells each")
+    for propagation, (stats, elapsed) in benchPropagation(puzzles).items():
+        print(f"{propagation:>4}: nodes {stats['nodes']:>8,}  revisions {stats['revisions']:>10,}"
+              f"  prunings {stats['prunings']:>8,}  time {elapsed:8.3f}s")
+
+def runConsistency(args):
+    print(f"{'bucket':<12} {'algorithm':<9} {'revisions':>10} {'prunings':>9} {'checks':>10} "
+          f"{'time':>8}")
+    for bucket in args.buckets:
+        results = benchConsistency(loadBucket(bucket), args.algorithms)
+        for algorithm, (revisions, prunings, checks, elapsed, states) in results.items():
+            print(f"{bucket:<12} {algorithm:<9} {revisions:>10,} {prunings:>9,} {checks:>10,} "
+                  f"{elapsed:7.3f}s")
+        first = results[args.algorithms[0]][4]
+        if any(result[4] != first for result in results.values()):
+            print(f"{bucket}: algorithms disagree on the end state")
+
+def runRules(args):
+    lines = [line for bucket in args.buckets for line in loadBucket(bucket)]
+    print(f"{len(lines)} puzzles ({', '.join(args.buckets)}), MAC search, node limit {args.node_limit}")
+    print(f"{'rules':<15} {'solved':>6} {'nodes':>9} {'backtracks':>10} {'revisions':>10} "
+          f"{'time':>8}  values removed per rule")
+    for name, (stats, solved, elapsed) in benchRules(lines, args.node_limit).items():
+        removed = ", ".join(f"{rule} {stats[rule]:,}" for rule in Propagation.RULES if rule in stats)
+        print(f"{name:<15} {solved:>6} {stats['nodes']:>9,} {stats['backtracks']:>10,} "
+              f"{stats['revisions']:>10,} {elapsed:7.3f}s  {removed}")
+
+def runScaling(args):
+    lines = [Creation.boardToLine(game) for game in makePuzzles(args.puzzles, args.seed, args.removed)]
+    rates = benchScaling(lines, args.engine, args.workers, args.chunk_size)
+    print(f"{len(lines)} puzzles, engine {args.engine}, chunks of {args.chunk_size}")
+    for workers, rate in rates.items():
+        print(f"{workers:>3} workers: {rate:10,.1f} puzzles/s  speedup {rate / rates[1]:5.2f}x")
+
+def runUniqueness(args):
+    checks = uniquenessChecks(Generator.generatePuzzles(args.puzzles, args.seed), args.seed)
+    print(f"{len(checks)} checks ({args.puzzles} half-dug generated puzzles, one clue removed)")
+    for name, (unique, stats, elapsed) in benchUniqueness(checks).items():
+        print(f"{name:<13} unique {unique:>5}  nodes/check {stats['nodes'] / len(checks):8.1f}  "
+              f"revisions/check {stats.get('revisions', 0) / len(checks):9.1f}  "
+              f"time {elapsed:8.3f}s  {len(checks) / elapsed:8,.1f} checks/s")
+
+def runGridSize(args):
+    results = benchGridSizes(args.sizes, args.engines, args.puzzles, args.seed, args.blanks,
+                             args.node_limit)
+    print(f"{args.puzzles} puzzles per size, {args.blanks:.0%} of the cells empty, "
+          f"node limit {args.node_limit}")
+    print(f"{'size':>5} {'engine':<8} {'done':>5} {'limit':>5} {'p50 ms':>8} {'max ms':>8} "
+          f"{'nodes/puzzle':>12} {'revisions/puzzle':>16}")
+    for (n, engine), r in results.items():
+        print(f"{n:>2}x{n:<2} {engine:<8} {r['solved'] + r['unsolvable']:>5} {r['limit']:>5} "
+              f"{formatMs(r['p50_ms'])} {formatMs(r['max_ms'])} "
+              f"{r['mean_nodes']:>12,.1f} {r['mean_revisions']:>16,.1f}")
+
+def runCache(args):
+    lines = cacheWorkload(loadBucket(args.bucket), args.variants, args.seed)
+    results, cache = benchCache(lines, args.engine, args.node_limit, args.size)
+    print(f"{len(lines)} puzzles ({args.variants} symmetric variants of each {args.bucket} puzzle), "
+          f"engine {args.engine}, cache of {args.size}")
+    for name, (solved, elapsed) in results.items():
+        print(f"{name:<7} solved {solved:>5}  time {elapsed:8.3f}s  {len(lines) / elapsed:8,.1f} puzzles/s")
+    info = cache.stats()
+    print(f"cache: {info['hits']} hits, {info['misses']} misses ({info['hit_rate']:.1%}), "
+          f"{info['entries']} entries")
+
+def runVector(args):
+    lines = cacheWorkload(loadBucket(args.bucket), args.variants, args.seed)
+    results, stats = benchVector(lines, args.engine, args.node_limit)
+    print(f"{len(lines)} boards ({args.variants} symmetric variants of each {args.bucket} puzzle), "
+          f"engine {args.engine}")
+    for name, (solved, elapsed) in results.items():
+        print(f"{name:<10} solved {solved:>6}  time {elapsed:8.3f}s  {len(lines) / elapsed:10,.1f} boards/s")
+    print(f"propagation: {stats['rounds']} rounds, {stats['naked_singles']:,} naked and "
+          f"{stats['hidden_singles']:,} hidden singles, {stats['propagated']} boards done, "
+          f"{stats['searched']} searched")
+
+def runCorpus(args):
+    corpus = makeCorpus(args.seed)
+    writeCorpus(corpus, args.seed, args.directory)
+    for bucket, lines in corpus.items():
+        print(f"{bucket}: {len(lines)} puzzles")
+
+def formatMs(value):
+    return "   -    " if value is None else f"{value:8.2f}"
+
+def runSuite(args):
+    report = benchSuite(args.engines, args.buckets, args.node_limit, args.memory_sample)
+    output = args.output or datetime.datetime.now().strftime("benchmark-%Y%m%d-%H%M%S.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"{'engine':<8} {'bucket':<12} {'done':>5} {'limit':>5} {'p50 ms':>8} {'p90 ms':>8} "
+          f"{'p99 ms':>8} {'nodes/puzzle':>12} {'revisions':>10} {'peak KiB':>9}")
+    for engine, buckets in report["results"].items():
+        for bucket, r in buckets.items():
+            peak = "-" if r["peak_memory_kib"] is None else f"{r['peak_memory_kib']:.0f}"
+            print(f"{engine:<8} {bucket:<12} {r['solved'] + r['unsolvable']:>5} {r['limit']:>5} "
+                  f"{formatMs(r['p50_ms'])} {formatMs(r['p90_ms'])} {formatMs(r['p99_ms'])} "
+                  f"{r['mean_nodes']:>12,.1f} {r['revisions']:>10,} {peak:>9}")
+    print(f"Results written to {output}")
+
+def runCompare(args):
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    print(f"{'engine':<8} {'bucket':<12} {'p50 old':>9} {'p50 new':>9} {'ratio':>6} {'nodes ratio':>11}")
+    for engine, buckets in new["results"].items():
+        for bucket, r in buckets.items():
+            before = old["results"].get(engine, {}).get(bucket)
+            if before is None:
+                continue
+            ratio = (f"{r['p50_ms'] / before['p50_ms']:6.2f}"
+                     if r["p50_ms"] is not None and before["p50_ms"] else "     -")
+            nodes = (f"{r['nodes'] / before['nodes']:11.2f}" if before["nodes"] else "          -")
+            print(f"{engine:<8} {bucket:<12} {formatMs(before['p50_ms'])} {formatMs(r['p50_ms'])} "
+                  f"{ratio} {nodes}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Sudoku CSP microbenchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    arcs = commands.add_parser("arcs", help="AC-3 arcs per second and neighbour lookups")
+    arcs.add_argument("--puzzles", type=int, default=20)
+    arcs.add_argument("--repeat", type=int, default=3)
+    arcs.add_argument("--seed", type=int, default=1)
+    arcs.set_defaults(run=runArcs)
+
+    ordering = commands.add_parser("ordering", help="backtracking variable/value orderings")
+    ordering.add_argument("--puzzles", type=int, default=10)
+    ordering.add_argument("--removed", type=int, default=55)
+    ordering.add_argument("--seed", type=int, default=1)
+    ordering.set_defaults(run=runOrdering)
+
+    propagation = commands.add_parser("propagation", help="MAC vs forward checking search")
+    propagation.add_argument("--puzzles", type=int, default=10)
+    propagation.add_argument("--removed", type=int, default=55)
+    propagation.add_argument("--seed", type=int, default=1)
+    propagation.set_defaults(run=runPropagation)
+
+    rules = commands.add_parser("rules", help="search removed by each Propagation rule")
+    rules.add_argument("--buckets", nargs="+", default=["hard", "17clue"], choices=BUCKETS)
+    rules.add_argument("--node-limit", type=int, default=100000)
+    rules.set_defaults(run=runRules)
+
+    consistency = commands.add_parser("consistency", help="constraint checks and time of each arc "
+                                      "consistency algorithm")
+    consistency.add_argument("--buckets", nargs="+", default=list(BUCKETS), choices=BUCKETS)
+    consistency.add_argument("--algorithms", nargs="+", default=list(ac.ALGORITHMS),
+                             choices=ac.ALGORITHMS)
+    consistency.set_defaults(run=runConsistency)
+
+    scaling = commands.add_parser("scaling", help="parallel batch throughput for 1..N workers")
+    scaling.add_argument("--puzzles", type=int, default=400)
+    scaling.add_argument("--removed", type=int, default=55)
+    scaling.add_argument("--seed", type=int, default=1)
+    scaling.add_argument("--engine", default="ac3+bt")
+    scaling.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    scaling.add_argument("--chunk-size", type=int, default=16)
+    scaling.set_defaults(run=runScaling)
+
+    uniqueness = commands.add_parser("uniqueness", help="solution counting for generator uniqueness checks")
+    uniqueness.add_argument("--puzzles", type=int, default=20)
+    uniqueness.add_argument("--seed", type=int, default=1)
+    uniqueness.set_defaults(run=runUniqueness)
+
+    gridsize = commands.add_parser("gridsize", help="engines on 4x4 up to 25x25 grids")
+    gridsize.add_argument("--sizes", nargs="+", type=int, default=[4, 9, 16, 25])
+    gridsize.add_argument("--engines", nargs="+", default=list(Solvers.ENGINES), choices=list(Solvers.ENGINES))
+    gridsize.add_argument("--puzzles", type=int, default=10)
+    gridsize.add_argument("--blanks", type=float, default=0.4, help="share of empty cells")
+    gridsize.add_argument("--seed", type=int, default=1)
+    gridsize.add_argument("--node-limit", type=int, default=20000)
+    gridsize.set_defaults(run=runGridSize)
+
+    cache = commands.add_parser("cache", help="solve cache on symmetric variants of a puzzle set")
+    cache.add_argument("--bucket", default="hard", choices=BUCKETS)
+    cache.add_argument("--variants", type=int, default=5)
+    cache.add_argument("--engine", default="ac3+bt")
+    cache.add_argument("--size", type=int, default=1000, help="cache entries")
+    cache.add_argument("--node-limit", type=int, default=100000)
+    cache.add_argument("--seed", type=int, default=1)
+    cache.set_defaults(run=runCache)
+
+    vector = commands.add_parser("vector", help="numpy batch propagation vs one board at a time")
+    vector.add_argument("--bucket", default="17clue", choices=BUCKETS)
+    vector.add_argument("--variants", type=int, default=40)
+    vector.add_argument("--engine", default="dlx")
+    vector.add_argument("--node-limit", type=int, default=100000)
+    vector.add_argument("--seed", type=int, default=1)
+    vector.set_defaults(run=runVector)
+
+    corpus = commands.add_parser("corpus", help="regenerate the checked-in puzzle sets")
+    corpus.add_argument("--seed", type=int, default=2024)
+    corpus.add_argument("--directory", default=CORPUS_DIR)
+    corpus.set_defaults(run=runCorpus)
+
+    suite = commands.add_parser("suite", help="every engine on every puzzle set, JSON report")
+    suite.add_argument("--engines", nargs="+", default=list(Solvers.ENGINES), choices=list(Solvers.ENGINES))
+    suite.add_argument("--buckets", nargs="+", default=list(BUCKETS), choices=BUCKETS)
+    suite.add_argument("--node-limit", type=int, default=100000,
+                       help="give up on a puzzle after this many nodes (counted as 'limit')")
+    suite.add_argument("--memory-sample", type=int, default=5,
+                       help="puzzles per set traced for peak memory (0 to skip)")
+    suite.add_argument("--output", help="JSON report path (default: benchmark-<time>.json)")
+    suite.set_defaults(run=runSuite)
+
+    compare = commands.add_parser("compare", help="compare two suite reports")
+    compare.add_argument("old")
+    compare.add_argument("new")
+    compare.set_defaults(run=runCompare)
+
+    args = parser.parse_args()
+    args.run(args)
+
+if __name__ == "__main__":
+    main()
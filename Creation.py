@@ -1,36 +1,85 @@
 import Backtracking as bk
 import Environment as env
+import SolveMAC as MAC
+import Symmetry
+import math
 import random
-import copy
+
+# value -> character and character -> value for puzzle lines (see env.VALUE_CHARS)
+_TO_CHARS = bytes.maketrans(bytes(range(len(env.VALUE_CHARS))), env.VALUE_CHARS.encode())
+_FROM_CHARS = {ch: value for value, ch in enumerate(env.VALUE_CHARS)}
+_FROM_CHARS.update((ch.lower(), value) for ch, value in list(_FROM_CHARS.items()))
 
 def copyBoard(board):
     """
-    Returns a deep copy of the Sudoku object
+    Returns an independent copy of the Sudoku object
+    """
+    return board.copy()
+
+def boardFromLine(line):
+    """
+    Builds a board from one line of n*n characters in row-major order,
+    n taken from the length (81: 9x9, 256: 16x16, 625: 25x25)
+    Values are 1-9 then A-P (env.VALUE_CHARS), anything else ('0', '.')
+    is an empty cell
+    """
+    line = line.strip()
+    n = math.isqrt(len(line))
+    if n * n != len(line):
+        raise ValueError(f"Expected n*n characters, got {len(line)}")
+    env.squareSize(n)
+    values = [_FROM_CHARS.get(ch, 0) for ch in line]
+    return env.sudoku.fromState([value if value <= n else 0 for value in values])
+
+def boardToLine(board):
+    """
+    One line of n*n value characters, 0 for empty cells
     """
-    new_board = env.sudoku()
-    new_board.board = copy.deepcopy(board.getBoard())
-    return new_board
+    return board.cells.translate(_TO_CHARS).decode("ascii")
+
+# Grids with more cells than this are filled by MAC in generateRandom
+MAC_FILL_CELLS = 81
+# Share of the cells generateRandom blanks out by default (50 of 81)
+REMOVED_SHARE = 50 / 81
 
-def generateRandom(input):
+def generateRandom(input, removed = None, progress = None):
     """
     Function go solve empty board using backtracking and then remove parts of the solution
     in order to make it valid board
+    Grids with more than MAC_FILL_CELLS cells are filled by MAC and then
+    shuffled by a random Symmetry transform: plain backtracking takes
+    minutes on them, and a randomized value order makes MAC run into long
+    dead ends
+    removed: number of cells to blank out (default: REMOVED_SHARE of the
+    board, at most every cell)
+    progress: optional callable passed to the search (see Backtracking)
     """
-    fullBoard = bk.backtrackingSearch(input, Randomize= True)
+    cellCount = input.n * input.n
+    if removed is None:
+        removed = int(cellCount * REMOVED_SHARE)
+    removed = max(0, min(removed, cellCount))
+    if cellCount > MAC_FILL_CELLS:
+        fullBoard = MAC.macSearch(input, progress=progress)
+        if fullBoard is not None:
+            transform = Symmetry.randomTransform(random, input.n, input.s)
+            input.setState(Symmetry.lineValues(Symmetry.applyTransform(boardToLine(input), transform)))
+    else:
+        fullBoard = bk.backtrackingSearch(input, Randomize=True, progress=progress)
     if fullBoard is not None:
-        cells = [(r, c) for r in range(9) for c in range(9)]
+        cells = [divmod(i, input.n) for i in range(cellCount)]
         random.shuffle(cells)
 
-        for i in range(50): #50 cells to be removed
+        for i in range(removed): #cells to be removed
             r, c = cells[i]
             input.addNum(r, c, 0)
  
 def validateInput(input):
     """
-    Function go solve a copy from the input, and if solved, then it is valid
+    Function go solve the input, and if solved, then it is valid
+    The search runs on the input itself and is rolled back afterwards
     """
-    newBoard = copyBoard(input)
-    if bk.backtrackingSearch(newBoard) is not None:
-        return True
-    else:
-        return False
\ No newline at end of file
+    mark = input.checkpoint()
+    try:
+        return bk.backtrackingSearch(input) is not None
+    finally:
+        input.rollback(mark)
\ No newline at end of file
@@ -0,0 +1,244 @@
+"""
+Dancing Links (Knuth's Algorithm X) solver
+Sudoku as exact cover: one matrix row per candidate (cell, value) and one
+column per constraint still open on the board (every empty cell needs a
+value, every row, column and square needs each of its missing values).
+The matrix is a toroidal doubly linked list kept in flat lists (node k has
+neighbours L[k], R[k], U[k], D[k] and column C[k], node 0 is the root), so
+covering and uncovering a column only relinks nodes.
+
+    dlxSearch(board)               solves board in place, like backtrackingSearch
+    countSolutions(board, None)    counts every solution
+"""
+import Environment as env
+import SearchTree as st
+import SolveStats
+from Backtracking import SearchLimitReached, PROGRESS_EVERY
+
+class ExactCover:
+    """
+    Exact cover matrix of a board's open constraints
+    rowOf[k] is the (cell index, value) of the matrix row holding node k
+    """
+    def __init__(self, csp):
+        self.n = n = csp.n
+        s = csp.s
+        cellCount = n * n
+        cells = csp.cells
+        # Open constraints: cell i, then value v of row r, column c and square b
+        # (numbered i, n*n + r*n + v-1, 2*n*n + c*n + v-1, 3*n*n + b*n + v-1)
+        open_ = [i for i in range(cellCount) if cells[i] == 0]
+        for base, used in ((cellCount, csp.rowUsed), (2 * cellCount, csp.colUsed),
+                           (3 * cellCount, csp.boxUsed)):
+            for unit in range(n):
+                open_.extend(base + unit * n + v for v in range(n) if not used[unit] >> v & 1)
+
+        columns = len(open_)
+        column = {constraint: k + 1 for k, constraint in enumerate(open_)}
+        self.L = L = [columns] + list(range(columns))
+        self.R = R = list(range(1, columns + 1)) + [0]
+        self.U = U = list(range(columns + 1))
+        self.D = D = list(range(columns + 1))
+        self.C = C = list(range(columns + 1))
+        self.S = S = [0] * (columns + 1)
+        self.rowOf = rowOf = [None] * (columns + 1)
+
+        for i in range(cellCount):
+            if cells[i] != 0:
+                continue
+            r, c = divmod(i, n)
+            b = r // s * s + c // s
+            mask = csp.candidates(r, c)
+            while mask:
+                low = mask & -mask
+                mask ^= low
+                v = low.bit_length() - 1
+                first = len(C)
+                for constraint in (i, cellCount + r * n + v, 2 * cellCount + c * n + v,
+                                   3 * cellCount + b * n + v):
+                    k = len(C)
+                    col = column[constraint]
+                    C.append(col)
+                    rowOf.append((i, v + 1))
+                    # Vertically: last node of the column
+                    U.append(U[col])
+                    D.append(col)
+                    D[U[col]] = k
+                    U[col] = k
+                    S[col] += 1
+                    # Horizontally: last node of the row
+                    L.append(k - 1 if k > first else k)
+                    R.append(first)
+                    if k > first:
+                        R[k - 1] = k
+                        L[first] = k
+
+    def cover(self, c):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        R[L[c]] = R[c]
+        L[R[c]] = L[c]
+        i = D[c]
+        while i != c:
+            j = R[i]
+            while j != i:
+                U[D[j]] = U[j]
+                D[U[j]] = D[j]
+                S[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def uncover(self, c):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        i = U[c]
+        while i != c:
+            j = L[i]
+            while j != i:
+                S[C[j]] += 1
+                U[D[j]] = j
+                D[U[j]] = j
+                j = L[j]
+            i = U[i]
+        R[L[c]] = c
+        L[R[c]] = c
+
+    def chooseColumn(self):
+        """
+        Open column with the fewest rows (S heuristic), 0 when none is open
+        """
+        R, S = self.R, self.S
+        best = 0
+        size = None
+        c = R[0]
+        while c != 0:
+            if size is None or S[c] < size:
+                best, size = c, S[c]
+                if size <= 1:
+                    break
+            c = R[c]
+        return best
+
+    def search(self, stats = None, nodeLimit = None, progress = None, tree = None, parent = 0):
+        """
+        Yields every exact cover as the list of chosen rows, as (cell index,
+        value) pairs; the matrix is restored once the generator is exhausted
+        stats: optional dict, "nodes" (rows tried) and "backtracks" are added to
+        it, "max_depth" raised to the most rows chosen at once
+        nodeLimit / progress: as in Backtracking.backtrackingSearch
+        tree, parent: optional TreeRecorder and node to record the search under
+        """
+        if stats is None:
+            stats = {}
+        stats.setdefault("nodes", 0)
+        stats.setdefault("backtracks", 0)
+        stats.setdefault("max_depth", 0)
+        R, D, L, C, rowOf = self.R, self.D, self.L, self.C, self.rowOf
+        chosen = []
+        # (tree node, solutions found before it) of every chosen row
+        treeNodes = [(parent, 0)]
+        found = 0
+        c = r = 0
+        while True:
+            if r == 0:
+                # Descend: cover the column with the fewest rows
+                c = self.chooseColumn()
+                if c == 0:
+                    found += 1
+                    yield [rowOf[k] for k in chosen]
+                    r = c = -1
+                else:
+                    self.cover(c)
+                    r = D[c]
+            if r == c:
+                # Column exhausted (or solution reported): undo the last row
+                if c > 0:
+                    self.uncover(c)
+                if not chosen:
+                    return
+                r = chosen.pop()
+                node, before = treeNodes.pop()
+                j = L[r]
+                while j != r:
+                    self.uncover(C[j])
+                    j = L[j]
+                c = C[r]
+                r = D[r]
+                if found == before:
+                    stats["backtracks"] += 1
+                    if tree is not None:
+                        tree.fail(node)
+                continue
+            # Try row r
+            stats["nodes"] += 1
+            if nodeLimit is not None and stats["nodes"] > nodeLimit:
+                raise SearchLimitReached(nodeLimit)
+            if progress is not None and stats["nodes"] % PROGRESS_EVERY == 0:
+                progress(stats)
+            chosen.append(r)
+            if len(chosen) > stats["max_depth"]:
+                stats["max_depth"] = len(chosen)
+            node = None
+            if tree is not None:
+                i, value = rowOf[r]
+                node = tree.add(treeNodes[-1][0], (divmod(i, self.n), value))
+            treeNodes.append((node, found))
+            j = R[r]
+            while j != r:
+                self.cover(C[j])
+                j = R[j]
+            r = 0
+
+def dlxSearch(csp, root = None, stats = None, nodeLimit = None, progress = None):
+    """
+    Solves csp with Dancing Links, same contract as
+    Backtracking.backtrackingSearch: the board is filled in place and
+    returned, or None when there is no solution
+    stats: optional dict, gets "nodes" (rows tried), "backtracks", "max_depth"
+    and the seconds of the init (building the matrix) and search phases
+    nodeLimit: optional number of nodes after which SearchLimitReached is raised
+    root: optional TreeNode, TreeRecorder or TreeBranch to record the search
+    tree under (see SearchTree)
+    progress: optional callable, gets stats every PROGRESS_EVERY nodes
+    """
+    if csp.hasConflicts():
+        return None
+    tree, top = st.recorderFor(root)
+    with SolveStats.phase(stats, "init"):
+        matrix = ExactCover(csp)
+    with SolveStats.phase(stats, "search"):
+        for rows in matrix.search(stats, nodeLimit, progress, tree, top):
+            n = csp.n
+            for i, value in rows:
+                csp.addNum(i // n, i % n, value)
+            return csp
+    return None
+
+def solutions(csp, limit = None, stats = None, nodeLimit = None):
+    """
+    Yields the solutions of csp as puzzle lines, at most limit of them
+    (None: all); the board is left as it was
+    """
+    if csp.hasConflicts() or (limit is not None and limit < 1):
+        return
+    values = list(csp.cells)
+    count = 0
+    for rows in ExactCover(csp).search(stats, nodeLimit):
+        solved = list(values)
+        for i, value in rows:
+            solved[i] = value
+        yield "".join(env.VALUE_CHARS[v] for v in solved)
+        count += 1
+        if limit is not None and count >= limit:
+            return
+
+def countSolutions(csp, limit = 2, stats = None, found = None, nodeLimit = None):
+    """
+    Number of solutions of csp, counting stops once limit are found
+    (None counts them all), like SolveMAC.countSolutions
+    found: optional list, every solution is appended to it as a puzzle line
+    """
+    total = 0
+    for line in solutions(csp, limit, stats, nodeLimit):
+        if found is not None:
+            found.append(line)
+        total += 1
+    return total
@@ -0,0 +1,143 @@
+import Environment as env
+from array import array
+
+# BITS[v] is the mask of value v, BITS[0] (empty cell) is no bit at all
+BITS = [0] + [1 << (v - 1) for v in range(1, 33)]
+
+def bit(value):
+    """
+    Mask with only the bit of value set (value 1 -> bit 0)
+    """
+    return 1 << (value - 1)
+
+def fullMask(n):
+    """
+    Mask holding every value 1..n
+    """
+    return (1 << n) - 1
+
+if hasattr(int, "bit_count"):
+    def popcount(mask):
+        """
+        Number of values in a mask
+        """
+        return mask.bit_count()
+else:
+    def popcount(mask):
+        """
+        Number of values in a mask
+        """
+        return bin(mask).count("1")
+
+def lowestBit(mask):
+    """
+    Mask of the smallest value in mask (0 if mask is empty)
+    """
+    return mask & -mask
+
+def lowestValue(mask):
+    """
+    Smallest value in mask (0 if mask is empty)
+    """
+    return (mask & -mask).bit_length()
+
+def maskValues(mask):
+    """
+    Values in mask, in increasing order
+    """
+    values = []
+    while mask:
+        low = mask & -mask
+        values.append(low.bit_length())
+        mask ^= low
+    return values
+
+def valuesMask(values):
+    """
+    Mask holding all the given values
+    """
+    mask = 0
+    for v in values:
+        mask |= 1 << (v - 1)
+    return mask
+
+class DomainStore:
+    """
+    Domains of all cells as one bitmask per cell in a flat array
+    Cell (r, c) lives at index r * N + c
+    A snapshot is a single array copy
+    """
+    def __init__(self, n=None, masks=None):
+        self.N = env.N if n is None else n
+        self.full = fullMask(self.N)
+        if masks is None:
+            masks = [self.full] * (self.N * self.N)
+        self.masks = array("L", masks)
+        # (cell, previous mask) for every narrow(), so search can undo
+        # its domain changes instead of copying the store
+        self.trail = []
+
+    def index(self, r, c):
+        return r * self.N + c
+
+    def cell(self, i):
+        return divmod(i, self.N)
+
+    def size(self, i):
+        return popcount(self.masks[i])
+
+    def isSingleton(self, i):
+        mask = self.masks[i]
+        return mask != 0 and mask & (mask - 1) == 0
+
+    def value(self, i):
+        """
+        Smallest value left in the domain of cell i (its value when singleton)
+        """
+        return lowestValue(self.masks[i])
+
+    def values(self, i):
+        return maskValues(self.masks[i])
+
+    def remove(self, i, value):
+        self.masks[i] &= ~(1 << (value - 1))
+
+    def assign(self, i, value):
+        self.masks[i] = 1 << (value - 1)
+
+    def narrow(self, i, mask):
+        """
+        Sets the domain of cell i to mask, remembering the old one on the trail
+        """
+        self.trail.append((i, self.masks[i]))
+        self.masks[i] = mask
+
+    def mark(self):
+        """
+        Trail position to undo back to
+        """
+        return len(self.trail)
+
+    def undo(self, mark):
+        """
+        Restores every domain narrowed since mark
+        """
+        trail = self.trail
+        masks = self.masks
+        while len(trail) > mark:
+            i, mask = trail.pop()
+            masks[i] = mask
+
+    def snapshot(self):
+        return self.masks[:]
+
+    def restore(self, snapshot):
+        self.masks[:] = snapshot
+
+    def copy(self):
+        return DomainStore(self.N, self.masks)
+
+    def __eq__(self, other):
+        if not isinstance(other, DomainStore):
+            return NotImplemented
+        return self.masks == other.masks
@@ -1,39 +1,164 @@
-N = 9 #Grid Size
-S = 3 #Sqiare Size
+import math
+
+N = 9 #Default grid size
+S = 3 #Default square size
 DOMAIN = [1,2,3,4,5,6,7,8,9]
+# Character of every value in puzzle lines and text (0 is empty), so grids
+# up to 25x25 fit one character per cell
+VALUE_CHARS = "0123456789ABCDEFGHIJKLMNOP"
+
+def squareSize(n):
+    """
+    Side of the squares of an n x n grid, ValueError when n is not a square
+    """
+    s = math.isqrt(n)
+    if s < 1 or s * s != n or n >= len(VALUE_CHARS):
+        raise ValueError(f"Unsupported grid size: {n}")
+    return s
 
 class sudoku ():
     """
     Sudoku game class:
-    Board representation: list of lists
+    Board geometry is per board: n x n cells in s x s squares (9 and 3
+    unless given), n = s * s
+    Board representation: flat bytearray of n*n values in row-major order
+    (cell (row, col) is at row * n + col, 0 is empty); state() is its
+    n*n-byte snapshot, getBoard() still gives the list of lists
+    Used digits of every row, column and square are kept as bitmasks
+    (value v -> bit v-1) and updated by addNum, together with the set of
+    empty cells
+    checkpoint() / rollback() undo addNum changes through a log of the
+    overwritten values, and copy() duplicates a board without rebuilding it
     """
-    def __init__(self):
-        self.board = [[0 for _ in range(N)] for _ in range(N)]
+    __slots__ = ("n", "s", "cells", "rowUsed", "colUsed", "boxUsed", "_extra", "empty",
+                 "_first", "log", "_depth")
+
+    def __init__(self, n = None):
+        self.n = N if n is None else n
+        self.s = squareSize(self.n)
+        self.setState(bytes(self.n * self.n))
+
+    def setBoard(self, board):
+        """
+        Replaces the grid with a list of lists and rebuilds the occupancy masks
+        """
+        self.setState([value for row in board for value in row])
+
+    def setState(self, state):
+        """
+        Replaces the grid with n*n values in row-major order (bytes or a list)
+        and rebuilds the occupancy masks
+        Raises RuntimeError inside an open checkpoint, which could not undo it
+        """
+        if getattr(self, "_depth", 0) > 0:
+            raise RuntimeError("Cannot replace the grid inside an open checkpoint")
+        n = self.n
+        if len(state) != n * n:
+            raise ValueError(f"Expected {n * n} values, got {len(state)}")
+        self.cells = bytearray(n * n)
+        self.rowUsed = [0] * n
+        self.colUsed = [0] * n
+        self.boxUsed = [0] * n
+        # (unit, value) -> extra copies of value in the unit (rows 0..N-1,
+        # columns N..2N-1, squares 2N..3N-1), so a duplicate does not clear
+        # a mask bit too early; empty for any consistent board
+        self._extra = {}
+        self.empty = set((r, c) for r in range(n) for c in range(n))
+        self._first = 0 #no empty cell before this flat index
+        self.log = None #(row, col, previous value) of every addNum after a checkpoint
+        self._depth = 0 #checkpoints not yet rolled back or released
+        for i, value in enumerate(state):
+            if value != 0:
+                self.addNum(i // n, i % n, value)
+
+    @classmethod
+    def fromState(cls, state):
+        """
+        Board of n*n values in row-major order, n taken from the length
+        """
+        board = cls.__new__(cls)
+        board.n = math.isqrt(len(state))
+        board.s = squareSize(board.n)
+        board.setState(state)
+        return board
+
+    def state(self):
+        """
+        The grid as n*n bytes, hashable and ready to store
+        """
+        return bytes(self.cells)
+
+    def copy(self):
+        """
+        Independent copy, the cells and masks are sliced instead of rebuilt
+        """
+        other = sudoku.__new__(sudoku)
+        other.n = self.n
+        other.s = self.s
+        other.cells = self.cells[:]
+        other.rowUsed = self.rowUsed[:]
+        other.colUsed = self.colUsed[:]
+        other.boxUsed = self.boxUsed[:]
+        other._extra = dict(self._extra)
+        other.empty = set(self.empty)
+        other._first = self._first
+        other.log = None
+        other._depth = 0
+        return other
+
+    def checkpoint(self):
+        """
+        Starts recording changes, returns the mark to give to rollback or release
+        Checkpoints nest: each one is ended by one rollback or release, inner
+        ones first, and recording stops when the outermost one ends
+        """
+        if self.log is None:
+            self.log = []
+        self._depth += 1
+        return len(self.log)
+
+    def rollback(self, mark):
+        """
+        Undoes every addNum made since checkpoint returned mark
+        """
+        log = self.log
+        self.log = None
+        while len(log) > mark:
+            row, col, value = log.pop()
+            self.addNum(row, col, value)
+        self._end(log)
+
+    def release(self, mark):
+        """
+        Keeps the changes made since checkpoint returned mark
+        """
+        self._end(self.log)
+
+    def _end(self, log):
+        self._depth -= 1
+        self.log = log if self._depth > 0 else None
 
     #Testing purposes
     # def printBoard(self):
-    #     for row in self.board:
+    #     for row in self.getBoard():
     #         print(*row)
     
     def printBoard(self):
-        for r in range(9):
-           if r % 3 == 0 and r != 0:
-            print("-" * 21)   
+        n, s = self.n, self.s
+        for r in range(n):
+           if r % s == 0 and r != 0:
+            print("-" * (2 * n + 2 * (s - 1) - 1))
 
            row_str = ""
-           for c in range(9):
-              if c % 3 == 0 and c != 0:
+           for c in range(n):
+              if c % s == 0 and c != 0:
                 row_str += "| "  
 
-              row_str += str(self.board[r][c]) + " "
+              row_str += VALUE_CHARS[self.cells[r * n + c]] + " "
            print(row_str)
 
     def isFilled(self):
-        for r in range (N):
-            for c in range (N):
-                if self.board[r][c] ==0:
-                    return False
-        return True
+        return not self.empty
     
     def getUnassigned(self):
         """
@@ -41,10 +166,14 @@ class sudoku ():
         from left to right
         up to down
         """
-        for r in range (N):
-            for c in range (N):
-                if self.board[r][c] ==0:
-                    return r,c
+        if not self.empty:
+            return None
+        i = self._first
+        cells = self.cells
+        while cells[i] != 0:
+            i += 1
+        self._first = i
+        return divmod(i, self.n)
     
     def getAllUnassigned(self):
         """
@@ -52,35 +181,109 @@ class sudoku ():
         from left to right
         up to down
         """
-        unassigned = set()
-        for r in range (N):
-            for c in range (N):
-                if self.board[r][c] ==0:
-                    unassigned.add((r,c))
-                
-        return unassigned
+        return set(self.empty)
+
+    def emptyCount(self):
+        return len(self.empty)
+
+    def hasConflicts(self):
+        """
+        True when a value appears twice in a row, column or square
+        """
+        return bool(self._extra)
+
+    def candidates(self, row, col):
+        """
+        Bitmask of the values that fit in (row, col) (value v -> bit v-1)
+        """
+        s = self.s
+        return ((1 << self.n) - 1) & ~(self.rowUsed[row] | self.colUsed[col]
+                                        | self.boxUsed[row // s * s + col // s])
     
     def getBoard(self):
-        return self.board
+        """
+        The grid as a new list of lists (changing it does not change the board)
+        """
+        cells, n = self.cells, self.n
+        return [list(cells[r * n:(r + 1) * n]) for r in range(n)]
+
+    def get(self, row, col):
+        return self.cells[row * self.n + col]
     
     def getRow(self,row):
-        return self.board[row]
+        """
+        Read-only view of the row (no copy)
+        """
+        n = self.n
+        return memoryview(self.cells)[row * n:(row + 1) * n].toreadonly()
     
     def getCol(self,col):
-        col = [row[col] for row in self.board]
-        return col
+        """
+        Read-only strided view of the column (no copy)
+        """
+        return memoryview(self.cells)[col::self.n].toreadonly()
 
     def getSquare(self, startingRow, startingCol):
-        square = []
-        for r in range(startingRow * S , startingRow*S + S):
-            for c in range(startingCol * S , startingCol*S + S):
-                square.append(self.board[r][c])
-        return square
+        """
+        Read-only views of the rows of the square, top to bottom (no copy;
+        a memoryview cannot be strided in two dimensions)
+        """
+        n, s = self.n, self.s
+        view = memoryview(self.cells).toreadonly()
+        start = startingRow * s * n + startingCol * s
+        return tuple(view[start + r * n:start + r * n + s] for r in range(s))
     
+    def _units(self, row, col, box):
+        n = self.n
+        return ((self.rowUsed, row, row), (self.colUsed, col, n + col),
+                (self.boxUsed, box, 2 * n + box))
+
     def addNum(self, row, col, value):
-        self.board[row][col] = value
+        i = row * self.n + col
+        old = self.cells[i]
+        if old == value:
+            return
+        if self.log is not None:
+            self.log.append((row, col, old))
+        s = self.s
+        box = row // s * s + col // s
+        if old != 0:
+            keep = ~(1 << (old - 1))
+            if self._extra:
+                for used, k, unit in self._units(row, col, box):
+                    extra = self._extra.get((unit, old))
+                    if extra:
+                        if extra == 1:
+                            del self._extra[(unit, old)]
+                        else:
+                            self._extra[(unit, old)] = extra - 1
+                    else:
+                        used[k] &= keep
+            else:
+                self.rowUsed[row] &= keep
+                self.colUsed[col] &= keep
+                self.boxUsed[box] &= keep
+        if value != 0:
+            bit = 1 << (value - 1)
+            if (self.rowUsed[row] | self.colUsed[col] | self.boxUsed[box]) & bit:
+                #value already in a unit: remember the duplicate
+                for used, k, unit in self._units(row, col, box):
+                    if used[k] & bit:
+                        self._extra[(unit, value)] = self._extra.get((unit, value), 0) + 1
+            self.rowUsed[row] |= bit
+            self.colUsed[col] |= bit
+            self.boxUsed[box] |= bit
+            if old == 0:
+                self.empty.discard((row, col))
+        else:
+            self.empty.add((row, col))
+            if i < self._first:
+                self._first = i
+        self.cells[i] = value
 
 class TreeNode:
+    __slots__ = ("label", "failed", "children")
+
     def __init__(self, label, failed=False):
         self.label = label
         self.failed = failed #For coloring
@@ -0,0 +1,241 @@
+"""
+Puzzle generator: streams puzzles that have exactly one solution, with a
+target number of clues and/or a difficulty band, reproducible from a seed.
+
+    python Generator.py -n 10000 -o puzzles.txt --seed 1 --workers 8
+    python Generator.py -n 100 --clues 26 --difficulty medium --format jsonl
+
+Puzzle i is built from its own seed (derived from --seed and i), so the
+output does not depend on the number of workers.
+"""
+import Batch
+import Domains as dom
+import Environment as env
+import SolveMAC as MAC
+import Symmetry
+from Backtracking import SearchLimitReached
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# Difficulty is the number of guesses (branchings on a cell with more than
+# one value left) the MAC search needs to solve a puzzle and prove it unique
+DIFFICULTIES = {
+    "easy": (0, 0),         # propagation alone solves it
+    "medium": (1, 9),
+    "hard": (10, 49),
+    "expert": (50, None),
+}
+FIELDS = ["index", "puzzle", "solution", "clues", "difficulty", "guesses", "attempts"]
+FORMATS = ("txt", "csv", "jsonl")
+# Nodes a single dig or rating search may take; 9x9 checks stay far below it,
+# larger grids near the minimal clue count can take millions
+CHECK_NODES = 2000
+
+def difficultyOf(guesses):
+    for name, (low, high) in DIFFICULTIES.items():
+        if guesses >= low and (high is None or guesses <= high):
+            return name
+    return None
+
+def puzzleSeed(seed, index):
+    """
+    Seed of puzzle index in a run seeded with seed
+    """
+    return seed * 1000003 + index
+
+def solutions(values, limit = 2, exclude = None, stats = None, rng = None, propagation = "ac3",
+              nodeLimit = None):
+    """
+    Up to limit solution lines of a puzzle given as a flat list of n*n values
+    (SolveMAC.countSolutions)
+    exclude: optional (cell index, value) that solutions must not use
+    stats: optional dict, gets the counters of countSolutions
+    rng: optional random.Random, values are then tried in random order
+    propagation: one of SolveMAC.PROPAGATIONS
+    nodeLimit: optional node budget, SearchLimitReached is raised past it
+    """
+    board = env.sudoku.fromState(values)
+    domains = None
+    if exclude is not None:
+        domains = dom.DomainStore(board.n)
+        domains.remove(*exclude)
+    found = []
+    MAC.countSolutions(board, limit, propagation, stats, domains, found, rng, nodeLimit)
+    return found
+
+def ratePuzzle(values):
+    """
+    (difficulty band, guesses) of a puzzle with a unique solution; a rating
+    search that takes more than CHECK_NODES nodes counts as expert
+    """
+    stats = {}
+    try:
+        solutions(values, 2, stats=stats, nodeLimit=CHECK_NODES)
+    except SearchLimitReached:
+        return "expert", stats["guesses"]
+    return difficultyOf(stats["guesses"]), stats["guesses"]
+
+def generatePuzzle(index, seed, clues = None, difficulty = None, maxAttempts = 100, n = None):
+    """
+    One puzzle with a unique solution, built from its own seed
+    A random full grid is dug out cell by cell in random order; a clue is
+    only removed when no other solution appears and, with a difficulty, when
+    the puzzle is not rated above its band. Digging stops at clues (or when
+    no clue can go), and the attempt is repeated from a new grid until the
+    clue count and difficulty band are met
+    A dig check that takes more than CHECK_NODES nodes keeps its clue (the
+    puzzle stays unique), a rating search that does counts as expert
+    Raises RuntimeError after maxAttempts misses
+    n: grid size (default 9)
+    """
+    n = env.N if n is None else n
+    env.squareSize(n)
+    cellCount = n * n
+    if clues is not None and not 0 <= clues <= cellCount:
+        raise ValueError(f"clues must be between 0 and {cellCount}")
+    if difficulty is not None and difficulty not in DIFFICULTIES:
+        raise ValueError(f"Unknown difficulty: {difficulty}")
+    # Most guesses the band allows, removals past it are put back
+    ceiling = DIFFICULTIES[difficulty][1] if difficulty is not None else None
+    rng = random.Random(seed)
+    for attempt in range(1, maxAttempts + 1):
+        solution = solutions([0] * cellCount, 1, rng=rng)[0]
+        values = Symmetry.lineValues(solution)
+        cells = list(range(cellCount))
+        rng.shuffle(cells)
+        filled = cellCount
+        for cell in cells:
+            if clues is not None and filled <= clues:
+                break
+            value = values[cell]
+            values[cell] = 0
+            # Unique without this clue unless a solution with another value there
+            # exists; forward checking is the fastest for this (Benchmark.py uniqueness)
+            try:
+                other = solutions(values, 1, exclude=(cell, value), propagation="fc",
+                                  nodeLimit=CHECK_NODES)
+            except SearchLimitReached:
+                other = True
+            if not other and ceiling is not None:
+                band, guesses = ratePuzzle(values)
+                other = band == "expert" or guesses > ceiling
+            if other:
+                values[cell] = value
+            else:
+                filled -= 1
+        if clues is not None and filled != clues:
+            continue
+        band, guesses = ratePuzzle(values)
+        if difficulty is not None and band != difficulty:
+            continue
+        return {"index": index, "puzzle": "".join(env.VALUE_CHARS[v] for v in values),
+                "solution": solution, "clues": filled, "difficulty": band,
+                "guesses": guesses, "attempts": attempt}
+    raise RuntimeError(f"No puzzle with clues={clues} difficulty={difficulty} "
+                       f"after {maxAttempts} attempts (puzzle {index})")
+
+def generateChunk(indices, seed, clues, difficulty, maxAttempts, n = None):
+    """
+    Generates the puzzles of a list of indices, runs inside a worker process
+    """
+    return [generatePuzzle(index, puzzleSeed(seed, index), clues, difficulty, maxAttempts, n)
+            for index in indices]
+
+def generatePuzzles(count, seed = 0, clues = None, difficulty = None, workers = 1,
+                    chunksize = 8, maxAttempts = 100, n = None):
+    """
+    Yields count puzzle records in index order
+    workers: number of processes (None or 0: all CPUs); like
+    Batch.solveLinesParallel, at most 2 chunks per worker are in flight
+    """
+    workers = workers or os.cpu_count() or 1
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+    if workers == 1:
+        for index in range(count):
+            yield generatePuzzle(index, puzzleSeed(seed, index), clues, difficulty, maxAttempts, n)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in Batch.chunked(range(count), chunksize):
+            pending.append(pool.submit(generateChunk, chunk, seed, clues, difficulty, maxAttempts, n))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+def writeRecords(records, out, fmt):
+    """
+    Writes records to the open file out: puzzle lines (txt), CSV or JSONL
+    Returns the number of records written
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt}")
+    count = 0
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=FIELDS)
+        writer.writeheader()
+    for record in records:
+        if fmt == "txt":
+            out.write(record["puzzle"] + "\n")
+        elif fmt == "csv":
+            writer.writerow(record)
+        else:
+            out.write(json.dumps(record) + "\n")
+        count += 1
+    return count
+
+def parseArgs(argv = None):
+    parser = argparse.ArgumentParser(description="Generate Sudoku puzzles with a unique solution")
+    parser.add_argument("-n", "--count", type=int, default=1, help="number of puzzles")
+    parser.add_argument("-o", "--output", default="-", help="output file ('-' for stdout)")
+    parser.add_argument("--format", choices=FORMATS,
+                        help="output format (default: from the output extension, else txt)")
+    parser.add_argument("--seed", type=int, help="seed of the run (default: random, printed)")
+    parser.add_argument("--clues", type=int, help="exact number of clues")
+    parser.add_argument("--difficulty", choices=list(DIFFICULTIES))
+    parser.add_argument("--size", type=int, default=env.N, help="grid size (4, 9, 16 or 25)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes (0 = all CPUs, default 1)")
+    parser.add_argument("--chunk-size", type=int, default=8,
+                        help="puzzles generated by a worker at a time")
+    parser.add_argument("--max-attempts", type=int, default=100,
+                        help="grids tried per puzzle before giving up")
+    args = parser.parse_args(argv)
+    if args.format is None:
+        if args.output.endswith(".csv"):
+            args.format = "csv"
+        elif args.output.endswith((".jsonl", ".json")):
+            args.format = "jsonl"
+        else:
+            args.format = "txt"
+    if args.seed is None:
+        args.seed = random.randrange(2 ** 32)
+    return args
+
+def main(argv = None):
+    args = parseArgs(argv)
+    target = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+    try:
+        start = time.perf_counter()
+        records = generatePuzzles(args.count, args.seed, args.clues, args.difficulty,
+                                  args.workers, args.chunk_size, args.max_attempts, args.size)
+        count = writeRecords(records, target, args.format)
+        elapsed = time.perf_counter() - start
+    finally:
+        if target is not sys.stdout:
+            target.close()
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"{count} puzzles in {elapsed:.3f}s ({rate:,.1f} puzzles/s, seed {args.seed}, "
+          f"{args.workers or os.cpu_count()} workers)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
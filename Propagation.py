@@ -0,0 +1,293 @@
+"""
+Propagation rules layered on AC-3
+AC-3 on the not-equal arcs can only prune with a singleton neighbour; these
+rules look at a whole unit (row, column or box) at once:
+- hidden_singles: a value that fits in only one cell of a unit goes there
+- naked_pairs / naked_triples: k cells of a unit holding only k values
+  between them take those values away from the rest of the unit
+- hidden_pairs / hidden_triples: k values that fit in only k cells of a unit
+  leave those cells no other value
+- alldiff: Regin's all-different filtering, a value stays only when some
+  matching of the unit's cells to distinct values uses it (subsumes the
+  others, but costs a matching per unit)
+Rules narrow a DomainStore (on its trail, so a search can undo them) and
+add the number of values they remove to stats[rule].
+"""
+import Domains as dom
+from itertools import combinations
+
+RULES = ("hidden_singles", "naked_pairs", "hidden_pairs", "naked_triples", "hidden_triples",
+         "alldiff")
+# alldiff is opt-in, it is the slowest
+DEFAULT_RULES = RULES[:5]
+
+# (N, S) -> tuple of units, each a tuple of flat cell indices
+_UNITS = {}
+
+def getUnits(n, s):
+    """
+    Every row, column and box of the grid as a tuple of flat indices
+    """
+    units = _UNITS.get((n, s))
+    if units is None:
+        rows = [tuple(r * n + c for c in range(n)) for r in range(n)]
+        cols = [tuple(r * n + c for r in range(n)) for c in range(n)]
+        boxes = [tuple((br + r) * n + bc + c for r in range(s) for c in range(s))
+                 for br in range(0, n, s) for bc in range(0, n, s)]
+        units = _UNITS[(n, s)] = tuple(rows + cols + boxes)
+    return units
+
+def checkRules(rules):
+    """
+    rules as a tuple in RULES order (None or empty: no rules)
+    """
+    if not rules:
+        return ()
+    unknown = set(rules) - set(RULES)
+    if unknown:
+        raise ValueError(f"Unknown rule: {', '.join(sorted(unknown))} (choose from {', '.join(RULES)})")
+    return tuple(rule for rule in RULES if rule in rules)
+
+def _narrow(domains, i, mask, singles):
+    if mask == 0:
+        raise ValueError(f"Empty domain for cell {i}, the rule should have reported a contradiction")
+    domains.narrow(i, mask)
+    if mask & (mask - 1) == 0:
+        singles.append(i)
+
+def hiddenSingles(domains, unit, singles):
+    """
+    Returns the number of values removed, None when a value fits nowhere
+    """
+    masks = domains.masks
+    once = twice = 0
+    for i in unit:
+        mask = masks[i]
+        twice |= once & mask
+        once |= mask
+    if once != domains.full:
+        return None
+    hidden = once & ~twice
+    removed = 0
+    while hidden:
+        low = hidden & -hidden
+        hidden ^= low
+        for i in unit:
+            if masks[i] & low:
+                break
+        else:
+            # An earlier hidden single took the only cell of this value
+            return None
+        mask = masks[i]
+        if mask != low:
+            removed += dom.popcount(mask) - 1
+            _narrow(domains, i, low, singles)
+    return removed
+
+def nakedSubsets(domains, unit, k, singles):
+    """
+    Returns the number of values removed, None when k cells share fewer
+    than k values
+    """
+    masks = domains.masks
+    cells = [i for i in unit if 2 <= dom.popcount(masks[i]) <= k]
+    removed = 0
+    for subset in combinations(cells, k):
+        union = 0
+        for i in subset:
+            union |= masks[i]
+        size = dom.popcount(union)
+        if size < k:
+            return None
+        if size > k:
+            continue
+        for j in unit:
+            mask = masks[j]
+            if mask & union and j not in subset:
+                mask &= ~union
+                if mask == 0:
+                    return None
+                removed += dom.popcount(masks[j] & union)
+                _narrow(domains, j, mask, singles)
+    return removed
+
+def hiddenSubsets(domains, unit, k, singles):
+    """
+    Returns the number of values removed, None when k values fit in fewer
+    than k cells
+    """
+    masks = domains.masks
+    # seen[j]: values that fit in more than j cells, only values fitting in
+    # 2..k cells can form a hidden subset
+    seen = [0] * (k + 1)
+    for i in unit:
+        mask = masks[i]
+        for j in range(k, 0, -1):
+            seen[j] |= seen[j - 1] & mask
+        seen[0] |= mask
+    candidates = seen[1] & ~seen[k]
+    if dom.popcount(candidates) < k:
+        return 0
+    # places[v]: positions in unit where value v + 1 fits
+    places = [0] * domains.N
+    for position, i in enumerate(unit):
+        mask = masks[i] & candidates
+        while mask:
+            low = mask & -mask
+            mask ^= low
+            places[low.bit_length() - 1] |= 1 << position
+    values = [v for v, where in enumerate(places) if where]
+    removed = 0
+    for subset in combinations(values, k):
+        where = 0
+        keep = 0
+        for v in subset:
+            where |= places[v]
+            keep |= 1 << v
+        size = dom.popcount(where)
+        if size < k:
+            return None
+        if size > k:
+            continue
+        while where:
+            low = where & -where
+            where ^= low
+            i = unit[low.bit_length() - 1]
+            mask = masks[i]
+            if mask & ~keep:
+                if mask & keep == 0:
+                    # An earlier subset took this cell's values of the subset
+                    return None
+                removed += dom.popcount(mask & ~keep)
+                _narrow(domains, i, mask & keep, singles)
+    return removed
+
+def _augment(cell, cellMasks, cellOf, valueOf, visited):
+    """
+    Kuhn's augmenting path from cell; visited is a one-item list of the
+    values already tried
+    """
+    mask = cellMasks[cell] & ~visited[0]
+    while mask:
+        low = mask & -mask
+        mask ^= low
+        visited[0] |= low
+        v = low.bit_length() - 1
+        other = cellOf[v]
+        if other < 0 or _augment(other, cellMasks, cellOf, valueOf, visited):
+            cellOf[v] = cell
+            valueOf[cell] = v
+            return True
+        mask &= ~visited[0]
+    return False
+
+def _components(cellMasks, cellOf, valueOf):
+    """
+    Strongly connected components (Tarjan) of the graph on the unit's
+    cells where a -> b when a can take the value matched to b
+    Returns the component number of every cell
+    """
+    count = len(cellMasks)
+    index = [-1] * count
+    low = [0] * count
+    component = [-1] * count
+    stack = []
+    onStack = [False] * count
+    counter = [0, 0]
+
+    def connect(a):
+        index[a] = low[a] = counter[0]
+        counter[0] += 1
+        stack.append(a)
+        onStack[a] = True
+        mask = cellMasks[a] & ~(1 << valueOf[a])
+        while mask:
+            bit = mask & -mask
+            mask ^= bit
+            b = cellOf[bit.bit_length() - 1]
+            if index[b] < 0:
+                connect(b)
+                low[a] = min(low[a], low[b])
+            elif onStack[b]:
+                low[a] = min(low[a], index[b])
+        if low[a] == index[a]:
+            while True:
+                b = stack.pop()
+                onStack[b] = False
+                component[b] = counter[1]
+                if b == a:
+                    break
+            counter[1] += 1
+
+    for a in range(count):
+        if index[a] < 0:
+            connect(a)
+    return component
+
+def allDifferent(domains, unit, singles):
+    """
+    Regin's filtering for the all-different constraint of one unit
+    A unit has as many values as cells, so every maximum matching is
+    perfect and a value stays in a cell only when it is matched there or
+    the cell and the value's matched cell share a strongly connected
+    component
+    Returns the number of values removed, None when no matching exists
+    """
+    masks = domains.masks
+    cellMasks = [masks[i] for i in unit]
+    if all(mask & (mask - 1) == 0 for mask in cellMasks):
+        return 0
+    cellOf = [-1] * domains.N
+    valueOf = [-1] * len(unit)
+    for cell in range(len(unit)):
+        if not _augment(cell, cellMasks, cellOf, valueOf, [0]):
+            return None
+    component = _components(cellMasks, cellOf, valueOf)
+    removed = 0
+    for cell, i in enumerate(unit):
+        mask = cellMasks[cell]
+        drop = 0
+        others = mask & ~(1 << valueOf[cell])
+        while others:
+            bit = others & -others
+            others ^= bit
+            if component[cellOf[bit.bit_length() - 1]] != component[cell]:
+                drop |= bit
+        if drop:
+            removed += dom.popcount(drop)
+            _narrow(domains, i, mask & ~drop, singles)
+    return removed
+
+_APPLY = {
+    "hidden_singles": hiddenSingles,
+    "naked_pairs": lambda domains, unit, singles: nakedSubsets(domains, unit, 2, singles),
+    "hidden_pairs": lambda domains, unit, singles: hiddenSubsets(domains, unit, 2, singles),
+    "naked_triples": lambda domains, unit, singles: nakedSubsets(domains, unit, 3, singles),
+    "hidden_triples": lambda domains, unit, singles: hiddenSubsets(domains, unit, 3, singles),
+    "alldiff": allDifferent,
+}
+
+def propagate(domains, units, rules, stats):
+    """
+    Applies the rules to every unit until none removes anything; after a
+    removal the cheaper rules run again first
+    Returns the cells the rules turned into singletons (for AC-3 to
+    propagate), or None on a contradiction
+    rules: rule names in RULES order (see checkRules)
+    """
+    singles = []
+    changed = True
+    while changed:
+        changed = False
+        for rule in rules:
+            apply = _APPLY[rule]
+            for unit in units:
+                removed = apply(domains, unit, singles)
+                if removed is None:
+                    return None
+                if removed:
+                    stats[rule] += removed
+                    changed = True
+            if changed:
+                break
+    return singles
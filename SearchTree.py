@@ -0,0 +1,183 @@
+"""
+Search-tree recording for the solvers
+
+Searches take a `root` to record their tree under. It can be
+- an Environment.TreeNode: one TreeNode per tried value (the original format)
+- a TreeRecorder: compact array store with node/depth budgets, sampling of
+  failed subtrees and optional streaming to a file
+- a TreeBranch returned by TreeRecorder.branch, to record under a group node
+"""
+import Environment as env
+import json
+import random
+from array import array
+
+NONE = -1 #handle of a node that was not recorded
+
+class NodeTree:
+    """
+    TreeRecorder interface over TreeNode objects
+    """
+    def __init__(self, root):
+        self.root = root
+
+    def add(self, parent, label):
+        node = env.TreeNode(label)
+        parent.add_child(node)
+        return node
+
+    def fail(self, node):
+        #Remove all children and detect failure
+        node.remove_children()
+        node.detect_fail()
+
+class TreeBranch:
+    """
+    Group node of a TreeRecorder that a search can record under
+    """
+    def __init__(self, recorder, node):
+        self.recorder = recorder
+        self.node = node
+
+class TreeRecorder:
+    """
+    Search tree stored as parallel arrays (parent, cell, value, depth, failed),
+    cell being row * 256 + col so any grid size fits
+    Node 0 is the root. Nodes are added in depth-first order, so when a node
+    fails every node after it is its descendant and dropping its subtree is
+    a truncation of the arrays.
+
+    maxNodes: nodes kept at most, further nodes (and their subtrees) are
+              not recorded and only counted in `dropped`
+    maxDepth: nodes deeper than this are not recorded
+    keepFailed: chance (0..1) that a failed subtree is kept in full; by
+                default only the failed node itself stays, like TreeNode
+    seed: seed for the failed-subtree sampling
+    stream: optional text file, every change is written to it as one JSON
+            line as it happens ({"op": "add"|"fail"|"drop", ...})
+    """
+    def __init__(self, label=("ROOT", None), maxNodes=None, maxDepth=None,
+                 keepFailed=0.0, seed=None, stream=None):
+        self.maxNodes = maxNodes
+        self.maxDepth = maxDepth
+        self.keepFailed = keepFailed
+        self._random = random.Random(seed)
+        self.stream = stream
+        self.limited = maxNodes is not None or maxDepth is not None
+        self.parent = array("i")
+        self.cell = array("h")
+        self.value = array("h")
+        self.depth = array("h")
+        self.failed = bytearray()
+        self.names = {} #node -> label of nodes that are not (cell, value)
+        self.dropped = 0
+        self.root = 0
+        self._append(NONE, label, 0)
+
+    def __len__(self):
+        return len(self.parent)
+
+    def _append(self, parent, label, depth):
+        node = len(self.parent)
+        self.cell.append(-1)
+        self.value.append(0)
+        self.names[node] = label
+        self.parent.append(parent)
+        self.depth.append(depth)
+        self.failed.append(0)
+        if self.stream is not None:
+            self.stream.write(json.dumps({"op": "add", "id": node, "parent": parent,
+                                          "label": list(label)}) + "\n")
+        return node
+
+    def add(self, parent, label):
+        """
+        Records label ((row, col), value) under parent
+        Returns the new node, or NONE when it falls outside the budget
+        """
+        if parent == NONE:
+            self.dropped += 1
+            return NONE
+        depth = self.depth[parent] + 1
+        node = len(self.parent)
+        if self.limited and ((self.maxNodes is not None and node >= self.maxNodes)
+                             or (self.maxDepth is not None and depth > self.maxDepth)):
+            self.dropped += 1
+            return NONE
+        (row, col), value = label
+        self.parent.append(parent)
+        self.cell.append(row << 8 | col)
+        self.value.append(value)
+        self.depth.append(depth)
+        self.failed.append(0)
+        if self.stream is not None:
+            self.stream.write('{"op": "add", "id": %d, "parent": %d, "label": [[%d, %d], %d]}\n'
+                              % (node, parent, row, col, value))
+        return node
+
+    def branch(self, label, parent=0):
+        """
+        Adds a named group node (e.g. ("AC", None)) and returns it as a search root
+        """
+        return TreeBranch(self, self._append(parent, label, self.depth[parent] + 1))
+
+    def fail(self, node):
+        """
+        Marks node as failed and, unless sampled to be kept, drops its subtree
+        """
+        if node == NONE:
+            return
+        self.failed[node] = 1
+        if self.stream is not None:
+            self.stream.write('{"op": "fail", "id": %d}\n' % node)
+        if node + 1 < len(self.parent):
+            if self.keepFailed and self._random.random() < self.keepFailed:
+                return
+            self.truncate(node + 1)
+
+    def truncate(self, size):
+        """
+        Forgets every node from index size on
+        """
+        for arr in (self.parent, self.cell, self.value, self.depth, self.failed):
+            del arr[size:]
+        if self.names and max(self.names) >= size:
+            for node in [n for n in self.names if n >= size]:
+                del self.names[node]
+        if self.stream is not None:
+            self.stream.write('{"op": "drop", "from": %d}\n' % size)
+
+    def label(self, node):
+        if node in self.names:
+            return self.names[node]
+        return (divmod(self.cell[node], 256), self.value[node])
+
+    def children(self):
+        """
+        List of child lists, indexed by node
+        """
+        kids = [[] for _ in range(len(self.parent))]
+        for node in range(1, len(self.parent)):
+            kids[self.parent[node]].append(node)
+        return kids
+
+    def toTreeNode(self):
+        """
+        Same tree as TreeNode objects (for code that walks TreeNode trees)
+        """
+        nodes = [env.TreeNode(self.label(n), bool(self.failed[n])) for n in range(len(self.parent))]
+        for node in range(1, len(self.parent)):
+            nodes[self.parent[node]].add_child(nodes[node])
+        return nodes[0]
+
+def recorderFor(root):
+    """
+    (tree, parent handle) to record a search under root, (None, None) without one
+    """
+    if root is None:
+        return None, None
+    if isinstance(root, TreeRecorder):
+        return root, root.root
+    if isinstance(root, TreeBranch):
+        return root.recorder, root.node
+    return NodeTree(root), root
@@ -1,54 +1,98 @@
-import Environment as env
-import copy
 import ArcConsistency as ac  
+import Propagation
+import SearchTree as st
+import SolveStats
+from collections import deque
 
-def enforceArcConsistency(csp, root):
+def enforceArcConsistency(csp, root=None, tracer=None, rules=None, stats=None, algorithm="ac3"):
     """
     This function:
     - Runs AC-3
     - Applies domain reductions to the board
     - Repeats AC-3 until no more changes can be made
     - Stops when the board is fully solved
+    root: optional TreeNode, TreeRecorder or TreeBranch (see SearchTree),
+    every singleton assignment is added under it
+    tracer: optional callable receiving the solver events (see Tracing),
+    nothing is logged without one
+    rules: optional Propagation rule names run after every AC-3 round
+    stats: optional dict, gets the values each rule removed, the
+    constraint checks ("checks") and the seconds of the init and
+    propagation phases
+    algorithm: arc consistency algorithm, one of ac.ALGORITHMS
     """
 
-    # Step 1: Initialize domains
-    domains = ac.initializeDomain(csp)
+    if stats is None:
+        stats = {}
+    # Step 1: Initialize domains and queue every arc once
+    with SolveStats.phase(stats, "init"):
+        domains = ac.initializeDomain(csp)
+        n = csp.n
+        peers = ac.getPeerIndex(n, csp.s)[0]
+        ArcQ = ac.queueArcs([r * n + c for r, c in csp.getAllUnassigned()], n, csp.s)
+    tree, top = st.recorderFor(root)
+    rules = Propagation.checkRules(rules)
+    for rule in rules:
+        stats.setdefault(rule, 0)
+    units = Propagation.getUnits(n, csp.s) if rules else None
+    # AC-2001 supports stay valid between rounds, the domains only shrink
+    residues = {}
     revision = 0
     pruning = 0
-    while True:
-        print("\n===== Starting AC-3 iteration =====")
-        # Make a copy to detect changes
-        old_domains = copy.deepcopy(domains)
-        # Run AC3 with logging
-        success, revised, pruned = ac.AC3(csp)
-        revision+=revised
-        pruning += pruned
-        if not success:
-            print("AC-3 detected inconsistency! No solution possible.")
-            return False, revision, pruning
+    with SolveStats.phase(stats, "propagation"):
+        while True:
+            if tracer is not None:
+                tracer("iteration")
+            # Run AC3 on our domains, they stay pruned between rounds
+            success, revised, pruned = ac.AC3(csp, tracer, domains, ArcQ, algorithm, stats, residues)
+            revision+=revised
+            pruning += pruned
+            if not success:
+                if tracer is not None:
+                    tracer("inconsistent")
+                return False, revision, pruning
+
+            # Unit rules find what the arcs alone cannot
+            if rules:
+                before = {rule: stats[rule] for rule in rules}
+                if Propagation.propagate(domains, units, rules, stats) is None:
+                    if tracer is not None:
+                        tracer("inconsistent")
+                    return False, revision, pruning
+                if tracer is not None:
+                    for rule in rules:
+                        if stats[rule] > before[rule]:
+                            tracer("rule", rule=rule, removed=stats[rule] - before[rule])
         
-        # Step 2: Update board with singleton domains
-        updated = False
-        for r in range(9):
-            for c in range(9):
-                if len(domains[(r, c)]) == 1:
-                    val = next(iter(domains[(r, c)]))
-                    if csp.board[r][c] == 0:
-                        print(f"Assigning X({r},{c}) = {val} because its domain is singleton.")
-                        assigned_node = env.TreeNode(((r,c), val))
-                        root.add_child(assigned_node)
-                        csp.addNum(r, c, val)
-                        updated = True
+            # Step 2: Update board with singleton (pruned) domains
+            assigned = []
+            for i, mask in enumerate(domains.masks):
+                r, c = divmod(i, n)
+                if csp.cells[i] == 0 and mask == 0:
+                    # A rule left a cell without values
+                    if tracer is not None:
+                        tracer("inconsistent")
+                    return False, revision, pruning
+                if csp.cells[i] == 0 and mask & (mask - 1) == 0:
+                    val = domains.value(i)
+                    if tracer is not None:
+                        tracer("assign", cell=(r, c), value=val)
+                    if tree is not None:
+                        tree.add(top, ((r,c), val))
+                    csp.addNum(r, c, val)
+                    assigned.append(i)
 
-        # Step 3: Recompute domains after assignments
-        domains = ac.initializeDomain(csp)
+            # Step 3: If board solved → finish
+            if csp.isFilled():
+                if tracer is not None:
+                    tracer("solved")
+                return True,  revision, pruning
 
-        # Step 4: If board solved → finish
-        if csp.isFilled():
-            print("\nBoard solved by repeated Arc Consistency!\n")
-            return True,  revision, pruning
+            # Step 4: Stop when no new value was assigned
+            if not assigned:
+                if tracer is not None:
+                    tracer("fixpoint")
+                return True,  revision, pruning
 
-        # Step 5: Stop when domains no longer change
-        if old_domains == domains and not updated:
-            print("\nNo more domain changes detected. Arc consistency complete.\n")
-            return True,  revision, pruning
+            # Step 5: Next round only revises the arcs into the new assignments
+            ArcQ = deque((Xi, Xj) for Xj in assigned for Xi in peers[Xj])
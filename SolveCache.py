@@ -0,0 +1,126 @@
+"""
+Solve cache for repeated and isomorphic puzzles
+Puzzles are keyed by their canonical form (Symmetry.canonicalForm), so a
+relabelled, transposed or band-swapped variant of a solved puzzle is a hit:
+the cached solution of the canonical puzzle is mapped back through the
+inverse transform. At most maxSize entries are kept, the least recently
+used one is evicted first. The cache can be saved to and loaded from a
+JSONL file ({"puzzle": canonical line, "solution": line or ""}).
+
+    cache = SolveCache(10000, "solve-cache.jsonl")
+    board = cache.solve(board, "ac3+bt")
+    cache.save()
+"""
+import Creation
+import Solvers
+import Symmetry
+import json
+import os
+from collections import OrderedDict
+
+class SolveCache:
+    def __init__(self, maxSize = 10000, path = None):
+        if maxSize < 1:
+            raise ValueError("maxSize must be at least 1")
+        self.maxSize = maxSize
+        self.path = path
+        # canonical line -> canonical solution line ("" when unsolvable)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def key(self, line):
+        """
+        (canonical line, transform) of a puzzle line, what lookup and store
+        compute when they are not given it
+        """
+        return Symmetry.canonicalForm(line)
+
+    def lookup(self, line, key = None):
+        """
+        (found, solution line) of a puzzle line; the solution is None for a
+        puzzle cached as unsolvable. Counts a hit or a miss
+        """
+        canonical, transform = key or self.key(line)
+        solution = self.entries.get(canonical)
+        if solution is None:
+            self.misses += 1
+            return False, None
+        self.entries.move_to_end(canonical)
+        self.hits += 1
+        if not solution:
+            return True, None
+        return True, Symmetry.applyTransform(solution, Symmetry.inverseTransform(transform))
+
+    def store(self, line, solution, key = None):
+        """
+        Remembers the solution line of a puzzle line (None: unsolvable)
+        """
+        canonical, transform = key or self.key(line)
+        if solution is not None:
+            solution = Symmetry.applyTransform(solution, transform)
+        self._put(canonical, solution or "")
+
+    def _put(self, canonical, solution):
+        self.entries[canonical] = solution
+        self.entries.move_to_end(canonical)
+        while len(self.entries) > self.maxSize:
+            self.entries.popitem(last=False)
+
+    def solve(self, csp, engine = "ac3+bt", stats = None, nodeLimit = None):
+        """
+        Engine call through the cache (see Solvers): on a hit the board is
+        filled from the cached solution without searching; on a miss the
+        engine runs and its result is stored
+        Returns the solved csp or None
+        """
+        if stats is None:
+            stats = {}
+        line = Creation.boardToLine(csp)
+        key = self.key(line)
+        found, solution = self.lookup(line, key)
+        if not found:
+            solved = Solvers.getEngine(engine)(csp, stats, nodeLimit)
+            self.store(line, None if solved is None else Creation.boardToLine(solved), key)
+            return solved
+        if solution is None:
+            return None
+        n = csp.n
+        for i, value in enumerate(Symmetry.lineValues(solution)):
+            if csp.cells[i] == 0:
+                csp.addNum(i // n, i % n, value)
+        return csp
+
+    def stats(self):
+        """
+        {"entries", "hits", "misses", "hit_rate"}
+        """
+        lookups = self.hits + self.misses
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def load(self, path = None):
+        """
+        Adds the entries of a JSONL file, the last lines being the most recent
+        """
+        with open(path or self.path, "r") as f:
+            for text in f:
+                if text.strip():
+                    entry = json.loads(text)
+                    self._put(entry["puzzle"], entry["solution"])
+
+    def save(self, path = None):
+        """
+        Writes every entry to a JSONL file, least recently used first
+        """
+        path = path or self.path
+        if path is None:
+            raise ValueError("No cache file given")
+        with open(path, "w") as f:
+            for canonical, solution in self.entries.items():
+                f.write(json.dumps({"puzzle": canonical, "solution": solution}) + "\n")
@@ -0,0 +1,272 @@
+import ArcConsistency as ac
+import Creation
+import Propagation
+import SearchTree as st
+import SolveStats
+from Backtracking import SearchLimitReached, PROGRESS_EVERY
+import random
+from collections import deque
+
+# "ac3" = Maintaining Arc Consistency (incremental AC-3 after every assignment)
+# "fc"  = Forward Checking (only the assigned cell's peers are revised)
+PROPAGATIONS = ("ac3", "fc")
+
+def macSearch(csp, root = None, Randomize = False, propagation = "ac3", stats = None,
+              nodeLimit = None, progress = None, rules = None):
+    """
+    Backtracking search that propagates after every assignment
+    Domain changes are recorded on the DomainStore trail and undone on
+    backtrack, nothing is copied
+    Returns the solved csp (like backtrackingSearch) or None
+    stats: optional dict, gets "nodes", "backtracks", "max_depth", "revisions",
+    "prunings" and the seconds of the init, propagation and search phases
+    nodeLimit: optional number of nodes after which SearchLimitReached is raised
+    root: optional TreeNode, TreeRecorder or TreeBranch to record the search
+    tree under (see SearchTree)
+    progress: optional callable, gets stats every PROGRESS_EVERY nodes; it
+    may raise (e.g. Backtracking.SearchCancelled) to stop the search
+    rules: optional Propagation rule names run after every propagation,
+    stats then also gets the values each rule removed
+    """
+    if propagation not in PROPAGATIONS:
+        raise ValueError(f"Unknown propagation: {propagation}")
+    rules = Propagation.checkRules(rules)
+    if stats is None:
+        stats = {}
+    for key in ("nodes", "backtracks", "max_depth", "revisions", "prunings") + rules:
+        stats.setdefault(key, 0)
+
+    with SolveStats.phase(stats, "init"):
+        domains = ac.initializeDomain(csp)
+        peers = ac.getPeerIndex(csp.n, csp.s)[0]
+        units = Propagation.getUnits(csp.n, csp.s) if rules else None
+
+    # Make the starting domains arc consistent with every singleton
+    with SolveStats.phase(stats, "propagation"):
+        singletons = [i for i in range(len(domains.masks)) if domains.isSingleton(i)]
+        if not propagateAC3(domains, singletons, peers, stats):
+            return None
+        if rules and not propagateRules(domains, peers, units, rules, stats):
+            return None
+        domains.trail.clear()
+
+    tree, top = st.recorderFor(root)
+    with SolveStats.phase(stats, "search"):
+        return mac(csp, domains, peers, Randomize, propagation, tree, top, stats, nodeLimit,
+                   progress, units, rules)
+
+def propagateAC3(domains, changed, peers, stats):
+    """
+    AC-3 restricted to the arcs pointing at the changed cells
+    Only a singleton Xj can prune Xi (not-equal constraints), so arcs into
+    Xi are queued again only when Xi becomes a singleton
+    Returns False when a domain is wiped out
+    """
+    masks = domains.masks
+    ArcQ = deque((Xi, Xj) for Xj in changed for Xi in peers[Xj])
+    while ArcQ:
+        Xi, Xj = ArcQ.popleft()
+        stats["revisions"] += 1
+        domainXj = masks[Xj]
+        domainXi = masks[Xi]
+        if domainXi & domainXj and domainXj & (domainXj - 1) == 0:
+            domainXi &= ~domainXj
+            domains.narrow(Xi, domainXi)
+            stats["prunings"] += 1
+            if domainXi == 0:
+                return False
+            if domainXi & (domainXi - 1) == 0:
+                ArcQ.extend((Xk, Xi) for Xk in peers[Xi] if Xk != Xj)
+    return True
+
+def propagateRules(domains, peers, units, rules, stats):
+    """
+    Propagation rules to a fixpoint, with AC-3 from every singleton they make
+    Returns False on a contradiction
+    """
+    while True:
+        singles = Propagation.propagate(domains, units, rules, stats)
+        if singles is None:
+            return False
+        if not singles:
+            return True
+        if not propagateAC3(domains, singles, peers, stats):
+            return False
+
+def forwardCheck(domains, cell, peers, stats):
+    """
+    Removes the value of cell from the domains of its peers
+    Returns False when a domain is wiped out
+    """
+    masks = domains.masks
+    value = masks[cell]
+    for Xi in peers[cell]:
+        stats["revisions"] += 1
+        domainXi = masks[Xi]
+        if domainXi & value:
+            domainXi &= ~value
+            domains.narrow(Xi, domainXi)
+            stats["prunings"] += 1
+            if domainXi == 0:
+                return False
+    return True
+
+def selectCell(csp, domains):
+    """
+    Empty cell with the smallest domain
+    Ties go to the cell with most empty peers, then to row-major order
+    (like Backtracking.selectMRV)
+    """
+    n = csp.n
+    peers = ac.getPeerIndex(n, csp.s)[0]
+    cells = csp.cells
+    best = None
+    bestKey = None
+    for r, c in csp.empty:
+        i = r * n + c
+        size = domains.size(i)
+        if bestKey is not None and size > bestKey[0]:
+            continue
+        degree = 0
+        for j in peers[i]:
+            if cells[j] == 0:
+                degree += 1
+        key = (size, -degree, i)
+        if bestKey is None or key < bestKey:
+            best, bestKey = i, key
+            if size == 0: #dead end, no need to look further
+                break
+    return best
+
+def mac(csp, domains, peers, Randomize, propagation, tree, parent, stats, nodeLimit = None,
+        progress = None, units = None, rules = (), depth = 1):
+    #1- Valid sudoku
+    if csp.isFilled():
+        return csp
+
+    #2- Most constrained unassigned place
+    cell = selectCell(csp, domains)
+    rowIndex, colIndex = divmod(cell, csp.n)
+
+    domain = domains.values(cell)
+    if Randomize:
+        random.shuffle(domain)
+
+    #3- Try all domain values, propagating after each one
+    if depth > stats["max_depth"]:
+        stats["max_depth"] = depth
+    for val in domain:
+        stats["nodes"] += 1
+        if nodeLimit is not None and stats["nodes"] > nodeLimit:
+            raise SearchLimitReached(nodeLimit)
+        if progress is not None and stats["nodes"] % PROGRESS_EVERY == 0:
+            progress(stats)
+        mark = domains.mark()
+        csp.addNum(rowIndex, colIndex, val)
+        domains.narrow(cell, 1 << (val - 1))
+        node = None
+        if tree is not None:
+            node = tree.add(parent, ((rowIndex, colIndex), val))
+
+        if propagation == "ac3":
+            consistent = propagateAC3(domains, [cell], peers, stats)
+        else:
+            consistent = forwardCheck(domains, cell, peers, stats)
+        if consistent and rules:
+            consistent = propagateRules(domains, peers, units, rules, stats)
+
+        if consistent:
+            result = mac(csp, domains, peers, Randomize, propagation, tree, node, stats, nodeLimit,
+                         progress, units, rules, depth + 1)
+            if result is not None:
+                return result
+
+        #Undo assignment and every domain change it caused
+        domains.undo(mark)
+        csp.addNum(rowIndex, colIndex, 0)
+        stats["backtracks"] += 1
+        if tree is not None:
+            tree.fail(node)
+
+    return None
+
+def countSolutions(csp, limit = 2, propagation = "ac3", stats = None, domains = None,
+                   found = None, rng = None, nodeLimit = None):
+    """
+    Number of solutions of csp; the search stops as soon as limit are found,
+    so limit=2 answers "is the solution unique" (None counts them all)
+    The board is left as it was
+    stats: optional dict, gets "nodes", "backtracks", "guesses" (branchings
+    on a cell with more than one value), "revisions" and "prunings"
+    domains: optional DomainStore restricting the values of every cell
+    found: optional list, every solution is appended to it as a puzzle line
+    rng: optional random.Random, values are then tried in random order
+    nodeLimit: optional number of nodes after which SearchLimitReached is
+    raised (the board is still restored)
+    """
+    if propagation not in PROPAGATIONS:
+        raise ValueError(f"Unknown propagation: {propagation}")
+    if limit is not None and limit < 1:
+        return 0
+    if stats is None:
+        stats = {}
+    for key in ("nodes", "backtracks", "guesses", "revisions", "prunings"):
+        stats.setdefault(key, 0)
+
+    start = ac.initializeDomain(csp)
+    if domains is not None:
+        for i, mask in enumerate(domains.masks):
+            start.masks[i] &= mask
+    if 0 in start.masks:
+        return 0
+    peers = ac.getPeerIndex(csp.n, csp.s)[0]
+    singletons = [i for i in range(len(start.masks)) if start.isSingleton(i)]
+    if not propagateAC3(start, singletons, peers, stats):
+        return 0
+    start.trail.clear()
+    return count(csp, start, peers, propagation, limit, stats, found, rng, nodeLimit)
+
+def count(csp, domains, peers, propagation, limit, stats, found = None, rng = None,
+          nodeLimit = None):
+    """
+    Solutions below the current assignment, at most limit
+    """
+    if csp.isFilled():
+        if found is not None:
+            found.append(Creation.boardToLine(csp))
+        return 1
+    cell = selectCell(csp, domains)
+    rowIndex, colIndex = divmod(cell, csp.n)
+    domain = domains.values(cell)
+    if len(domain) > 1:
+        stats["guesses"] += 1
+    if rng is not None:
+        rng.shuffle(domain)
+
+    total = 0
+    for val in domain:
+        stats["nodes"] += 1
+        if nodeLimit is not None and stats["nodes"] > nodeLimit:
+            raise SearchLimitReached(nodeLimit)
+        mark = domains.mark()
+        csp.addNum(rowIndex, colIndex, val)
+        domains.narrow(cell, 1 << (val - 1))
+        try:
+            if propagation == "ac3":
+                consistent = propagateAC3(domains, [cell], peers, stats)
+            else:
+                consistent = forwardCheck(domains, cell, peers, stats)
+            below = 0
+            if consistent:
+                below = count(csp, domains, peers, propagation,
+                              None if limit is None else limit - total, stats, found, rng,
+                              nodeLimit)
+        finally:
+            domains.undo(mark)
+            csp.addNum(rowIndex, colIndex, 0)
+        if below == 0:
+            stats["backtracks"] += 1
+        total += below
+        if limit is not None and total >= limit:
+            break
+    return total
@@ -0,0 +1,157 @@
+"""
+Solving engines behind one signature:
+engine(csp, stats, nodeLimit=None) -> solved csp or None
+stats is a dict the engine adds its counters to
+("nodes", "backtracks", "max_depth", "revisions", "prunings", the seconds
+of each SolveStats phase, and with Propagation rules the values each rule
+removed)
+nodeLimit makes the search raise Backtracking.SearchLimitReached
+solve() runs an engine with a fresh SolveStats and times the whole solve
+"""
+import Backtracking as bk
+import DancingLinks as DL
+import Propagation
+import SolveAC as ACS
+import SolveMAC as MAC
+import SolveStats
+import time
+import tracemalloc
+from Backtracking import SearchLimitReached, SearchCancelled
+
+def _counters(stats):
+    for key in ("nodes", "backtracks", "max_depth", "revisions", "prunings"):
+        stats.setdefault(key, 0)
+    return stats
+
+def solveBacktracking(csp, stats, nodeLimit = None):
+    """
+    Plain backtracking, first empty cell in row-major order
+    """
+    with SolveStats.phase(stats, "search"):
+        return bk.backtrackingSearch(csp, stats=_counters(stats), nodeLimit=nodeLimit)
+
+def solveMRV(csp, stats, nodeLimit = None):
+    """
+    Backtracking with minimum remaining values ordering
+    """
+    with SolveStats.phase(stats, "search"):
+        return bk.backtrackingSearch(csp, varOrder="mrv", stats=_counters(stats),
+                                     nodeLimit=nodeLimit)
+
+def solveAC3Backtracking(csp, stats, nodeLimit = None):
+    """
+    Repeated AC-3 first, then plain backtracking for what is left
+    (the GUI's original full solve)
+    """
+    _counters(stats)
+    success, revision, pruning = ACS.enforceArcConsistency(csp, stats=stats)
+    stats["revisions"] += revision
+    stats["prunings"] += pruning
+    if not success:
+        return None
+    with SolveStats.phase(stats, "search"):
+        return bk.backtrackingSearch(csp, stats=stats, nodeLimit=nodeLimit)
+
+def solveAC2001Backtracking(csp, stats, nodeLimit = None):
+    """
+    Same as ac3+bt with AC-2001 (last support residues) for the arc
+    consistency rounds
+    """
+    _counters(stats)
+    success, revision, pruning = ACS.enforceArcConsistency(csp, stats=stats, algorithm="ac2001")
+    stats["revisions"] += revision
+    stats["prunings"] += pruning
+    if not success:
+        return None
+    with SolveStats.phase(stats, "search"):
+        return bk.backtrackingSearch(csp, stats=stats, nodeLimit=nodeLimit)
+
+def solveRulesBacktracking(csp, stats, nodeLimit = None):
+    """
+    Repeated AC-3 with the default Propagation rules, then plain backtracking
+    """
+    _counters(stats)
+    success, revision, pruning = ACS.enforceArcConsistency(csp, rules=Propagation.DEFAULT_RULES,
+                                                           stats=stats)
+    stats["revisions"] += revision
+    stats["prunings"] += pruning
+    if not success:
+        return None
+    with SolveStats.phase(stats, "search"):
+        return bk.backtrackingSearch(csp, stats=stats, nodeLimit=nodeLimit)
+
+def solveMAC(csp, stats, nodeLimit = None):
+    """
+    Search maintaining arc consistency
+    """
+    return MAC.macSearch(csp, propagation="ac3", stats=_counters(stats), nodeLimit=nodeLimit)
+
+def solveMACRules(csp, stats, nodeLimit = None):
+    """
+    Search maintaining arc consistency and the default Propagation rules
+    """
+    return MAC.macSearch(csp, propagation="ac3", stats=_counters(stats), nodeLimit=nodeLimit,
+                         rules=Propagation.DEFAULT_RULES)
+
+def solveFC(csp, stats, nodeLimit = None):
+    """
+    Search with forward checking
+    """
+    return MAC.macSearch(csp, propagation="fc", stats=_counters(stats), nodeLimit=nodeLimit)
+
+def solveDLX(csp, stats, nodeLimit = None):
+    """
+    Dancing Links exact cover search (nodes are matrix rows tried)
+    """
+    return DL.dlxSearch(csp, stats=_counters(stats), nodeLimit=nodeLimit)
+
+def solve(csp, engine = "mac", nodeLimit = None, stats = None, memory = False):
+    """
+    Runs the named engine on csp
+    Returns (solved csp or None, SolveStats); SearchLimitReached still
+    propagates, a stats passed in holds the counters up to the limit
+    memory: trace the peak memory of the solve with tracemalloc (slower)
+    """
+    solveEngine = getEngine(engine)
+    if stats is None:
+        stats = SolveStats.SolveStats()
+    tracing = memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        solution = solveEngine(csp, stats, nodeLimit)
+    finally:
+        stats["seconds"] = time.perf_counter() - start
+        if tracing:
+            stats["peak_memory_kib"] = tracemalloc.get_traced_memory()[1] / 1024
+            tracemalloc.stop()
+    return solution, stats
+
+def countSolutions(csp, limit = 2, stats = None):
+    """
+    Number of solutions of csp, the search stops once limit are found
+    (MAC search, the board is left as it was)
+    """
+    return MAC.countSolutions(csp, limit, stats=stats)
+
+def hasUniqueSolution(csp):
+    return countSolutions(csp, 2) == 1
+
+ENGINES = {
+    "bt": solveBacktracking,
+    "mrv": solveMRV,
+    "ac3+bt": solveAC3Backtracking,
+    "ac2001+bt": solveAC2001Backtracking,
+    "rules+bt": solveRulesBacktracking,
+    "mac": solveMAC,
+    "mac+rules": solveMACRules,
+    "fc": solveFC,
+    "dlx": solveDLX,
+}
+
+def getEngine(name):
+    try:
+        return ENGINES[name]
+    except KeyError:
+        raise ValueError(f"Unknown engine: {name} (choose from {', '.join(ENGINES)})") from None
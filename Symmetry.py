@@ -0,0 +1,190 @@
+"""
+Sudoku symmetries on puzzle lines (n*n characters, row-major, 0 or '.' empty,
+values written as in env.VALUE_CHARS)
+A transform is (transpose, rows, cols, digits):
+- transpose: rows and columns are swapped first
+- rows / cols: output row r is row rows[r] (columns alike); permutations only
+  move rows inside their band and whole bands (columns: stacks)
+- digits: digits[v] is the new label of value v, digits[0] is 0
+Every transform maps a valid puzzle to a valid puzzle with the same number
+of solutions.
+"""
+import Environment as env
+import math
+import random
+from itertools import permutations
+
+def lineValues(line):
+    return [max(env.VALUE_CHARS.find(ch.upper()), 0) for ch in line.strip()]
+
+def identityTransform(n = None):
+    n = env.N if n is None else n
+    return (False, list(range(n)), list(range(n)), list(range(n + 1)))
+
+def randomLinePermutation(rng = random, n = None, s = None):
+    """
+    Random row (or column) order that keeps bands together
+    """
+    n = env.N if n is None else n
+    s = env.S if s is None else s
+    bands = list(range(n // s))
+    rng.shuffle(bands)
+    order = []
+    for band in bands:
+        inner = list(range(s))
+        rng.shuffle(inner)
+        order.extend(band * s + i for i in inner)
+    return order
+
+def randomTransform(rng = random, n = None, s = None):
+    n = env.N if n is None else n
+    s = env.S if s is None else s
+    digits = list(range(1, n + 1))
+    rng.shuffle(digits)
+    return (rng.random() < 0.5,
+            randomLinePermutation(rng, n, s),
+            randomLinePermutation(rng, n, s),
+            [0] + digits)
+
+def applyTransform(line, transform):
+    """
+    Transformed copy of a puzzle line (empty cells come out as 0)
+    """
+    transpose, rows, cols, digits = transform
+    n = len(rows)
+    values = lineValues(line)
+    out = []
+    for r in range(n):
+        for c in range(n):
+            if transpose:
+                v = values[cols[c] * n + rows[r]]
+            else:
+                v = values[rows[r] * n + cols[c]]
+            out.append(env.VALUE_CHARS[digits[v]])
+    return "".join(out)
+
+def inverseTransform(transform):
+    """
+    Transform undoing transform: applyTransform(applyTransform(line, t),
+    inverseTransform(t)) == line (empty cells as 0)
+    """
+    transpose, rows, cols, digits = transform
+    rowsBack = [0] * len(rows)
+    colsBack = [0] * len(cols)
+    digitsBack = [0] * len(digits)
+    for position, row in enumerate(rows):
+        rowsBack[row] = position
+    for position, col in enumerate(cols):
+        colsBack[col] = position
+    for value, label in enumerate(digits):
+        digitsBack[label] = value
+    if transpose:
+        return (True, colsBack, rowsBack, digitsBack)
+    return (False, rowsBack, colsBack, digitsBack)
+
+# States kept per row by canonicalForm; past it the result is still a
+# transform of the puzzle but two variants may get different forms
+CANONICAL_STATES = 4096
+
+def canonicalForm(line, n = None):
+    """
+    (canonical line, transform) of a puzzle line: the smallest line (row
+    by row, 0 before any value, values relabelled in order of first
+    appearance) among every transform of the puzzle, and a transform
+    giving it, so that applyTransform(line, transform) == canonical line
+    Isomorphic puzzles get the same canonical line.
+    Rows are chosen one at a time; columns only get ordered as far as the
+    rows so far tell them apart (columns with the same values are kept in
+    one group), so only ties between rows and between new values branch
+    """
+    values = lineValues(line)
+    if n is None:
+        n = env.N if not values else math.isqrt(len(values))
+    s = env.squareSize(n)
+    if len(values) != n * n:
+        raise ValueError(f"Expected {n * n} values, got {len(values)}")
+    grids = (values, [values[c * n + r] for r in range(n) for c in range(n)])
+    # state: (transpose, rows chosen, column groups in order, labels of values)
+    states = []
+    for transpose in (False, True):
+        for stacks in permutations(range(s)):
+            groups = [tuple(stack * s + c for c in range(s)) for stack in stacks]
+            states.append((transpose, [], groups, {}))
+
+    canonical = []
+    for step in range(n):
+        best = None
+        chosen = []
+        for state in states:
+            transpose, rows, groups, labels = state
+            grid = grids[transpose]
+            if step % s:
+                band = rows[-1] // s
+                choices = [row for row in range(band * s, band * s + s) if row not in rows]
+            else:
+                used = {row // s for row in rows}
+                choices = [row for row in range(n) if row // s not in used]
+            for row in choices:
+                base = row * n
+                out = []
+                fresh = len(labels) + 1
+                for group in groups:
+                    known = []
+                    for col in group:
+                        v = grid[base + col]
+                        if v == 0:
+                            out.append(0)
+                        elif v in labels:
+                            known.append(labels[v])
+                        else:
+                            known.append(None)
+                    out.extend(sorted(label for label in known if label is not None))
+                    for label in known:
+                        if label is None:
+                            out.append(fresh)
+                            fresh += 1
+                out = tuple(out)
+                if best is None or out < best:
+                    best = out
+                    chosen = [(state, row)]
+                elif out == best:
+                    chosen.append((state, row))
+        canonical.extend(best)
+        states = []
+        for (transpose, rows, groups, labels), row in chosen:
+            grid = grids[transpose]
+            base = row * n
+            # Split every group into its zeros (still tied), its labelled
+            # values in label order, then its new values in every order
+            split = [[]]
+            for group in groups:
+                zeros = tuple(col for col in group if grid[base + col] == 0)
+                known = sorted((labels[grid[base + col]], col) for col in group
+                               if grid[base + col] in labels)
+                new = [col for col in group if grid[base + col] and grid[base + col] not in labels]
+                head = ([zeros] if zeros else []) + [(col,) for label, col in known]
+                orders = list(permutations(new)) if new else [()]
+                split = [done + head + [(col,) for col in order]
+                         for done in split for order in orders]
+            for order in split:
+                newLabels = dict(labels)
+                for group in order:
+                    v = grid[base + group[0]]
+                    if len(group) == 1 and v and v not in newLabels:
+                        newLabels[v] = len(newLabels) + 1
+                states.append((transpose, rows + [row], order, newLabels))
+                if len(states) >= CANONICAL_STATES:
+                    break
+            if len(states) >= CANONICAL_STATES:
+                break
+
+    transpose, rows, groups, labels = states[0]
+    cols = [col for group in groups for col in group]
+    digits = [0] * (n + 1)
+    for v, label in labels.items():
+        digits[v] = label
+    unused = iter(range(len(labels) + 1, n + 1))
+    for v in range(1, n + 1):
+        if v not in labels:
+            digits[v] = next(unused)
+    return "".join(env.VALUE_CHARS[v] for v in canonical), (transpose, rows, cols, digits)
@@ -0,0 +1,66 @@
+"""
+Tracers for the solvers
+A tracer is any callable tracer(event, **info). Solvers only build the event
+data when a tracer is attached, so the default (None) costs nothing.
+
+Events:
+- "revise":     Xi, Xj, domainXi, domainXj   (arc about to be revised)
+- "prune":      Xi, Xj, value                (value removed from Xi)
+- "revised":    Xi, domain                   (domain of Xi after the revision)
+- "wipeout":    cell                         (AC-3 emptied a domain)
+- "rule":       rule, removed                (a Propagation rule removed values)
+- "iteration":                               (enforceArcConsistency starts a round)
+- "inconsistent":                            (enforceArcConsistency gives up)
+- "assign":     cell, value                  (singleton written to the board)
+- "solved":                                  (board filled by arc consistency)
+- "fixpoint":                                (no more domain changes)
+Cells are (row, col) tuples and domains are sorted lists of values.
+"""
+
+def formatEvent(event, info):
+    """
+    Log text for an event, matching the solver's historical print output
+    Returns None for unknown events
+    """
+    if event == "revise":
+        return (f"Revising arc ({info['Xi']}, {info['Xj']})\n"
+                f"Current domain of {info['Xi']}: {info['domainXi']}\n"
+                f"Domain of {info['Xj']}: {info['domainXj']}")
+    if event == "prune":
+        return f"Removed value {info['value']} from {info['Xi']} because no supporting value exists in {info['Xj']}"
+    if event == "revised":
+        return f"Updated domain of {info['Xi']}: {info['domain']}\n" + "-" * 40
+    if event == "wipeout":
+        return f"Inconsistent! Empty domain for {info['cell']}"
+    if event == "rule":
+        return f"Rule {info['rule']} removed {info['removed']} value(s)"
+    if event == "iteration":
+        return "\n===== Starting AC-3 iteration ====="
+    if event == "inconsistent":
+        return "AC-3 detected inconsistency! No solution possible."
+    if event == "assign":
+        r, c = info["cell"]
+        return f"Assigning X({r},{c}) = {info['value']} because its domain is singleton."
+    if event == "solved":
+        return "\nBoard solved by repeated Arc Consistency!\n"
+    if event == "fixpoint":
+        return "\nNo more domain changes detected. Arc consistency complete.\n"
+    return None
+
+def textTracer(write):
+    """
+    Tracer that formats every event and passes the text to write
+    """
+    def tracer(event, **info):
+        text = formatEvent(event, info)
+        if text is not None:
+            write(text)
+    return tracer
+
+def printTracer(event, **info):
+    """
+    Tracer that prints the detailed solver log to stdout
+    """
+    text = formatEvent(event, info)
+    if text is not None:
+        print(text)
@@ -0,0 +1,189 @@
+"""
+Vectorized constraint propagation over many boards at once (needs numpy)
+K boards are a (K, n*n) uint8 array of values (0 empty) and their
+candidates a (K, n*n) bitmask array (uint16 up to 16x16, uint32 for 25x25,
+value v -> bit v-1). Every round recomputes the candidates of all boards
+with array operations and fills in naked singles (one candidate left) and
+hidden singles (the only place of a value in a unit), until no board
+changes. Boards left unsolved go to a scalar engine (see Solvers).
+
+    boards = loadBoards(lines)
+    boards, status = propagateBoards(boards)
+    solutions = solveLines(lines, "mac")
+"""
+import Creation
+import Environment as env
+import Solvers
+import numpy as np
+
+# status of a board after propagateBoards
+OPEN, SOLVED, INVALID = 0, 1, 2
+
+# Bits set in every 16-bit number
+_POPCOUNT16 = np.array([bin(x).count("1") for x in range(1 << 16)], dtype=np.uint8)
+
+# n -> (units, cellUnits): units is (3n, n) cell indices (rows, columns,
+# squares), cellUnits (n*n, 3) the row, column and square of every cell
+_GEOMETRY = {}
+
+def geometry(n):
+    table = _GEOMETRY.get(n)
+    if table is None:
+        s = env.squareSize(n)
+        rows = [[r * n + c for c in range(n)] for r in range(n)]
+        cols = [[r * n + c for r in range(n)] for c in range(n)]
+        boxes = [[(br + r) * n + bc + c for r in range(s) for c in range(s)]
+                 for br in range(0, n, s) for bc in range(0, n, s)]
+        units = np.array(rows + cols + boxes, dtype=np.intp)
+        cellUnits = np.array([[i // n, n + i % n, 2 * n + (i // n // s) * s + i % n // s]
+                              for i in range(n * n)], dtype=np.intp)
+        table = _GEOMETRY[n] = (units, cellUnits)
+    return table
+
+def maskType(n):
+    return np.uint16 if n <= 16 else np.uint32
+
+def popcount(masks):
+    """
+    Bits set in every element of a uint16 or uint32 array
+    """
+    if masks.dtype == np.uint16:
+        return _POPCOUNT16[masks]
+    return _POPCOUNT16[masks & 0xFFFF] + _POPCOUNT16[masks >> 16]
+
+def loadBoards(lines, n = None):
+    """
+    (K, n*n) uint8 array of puzzle lines (all of one size, n taken from
+    the first line when not given)
+    """
+    lines = [line.strip() for line in lines]
+    if not lines:
+        return np.zeros((0, (n or env.N) ** 2), dtype=np.uint8)
+    if n is None:
+        n = int(round(len(lines[0]) ** 0.5))
+    env.squareSize(n)
+    if any(len(line) != n * n for line in lines):
+        raise ValueError(f"Every line must have {n * n} characters")
+    # Like Creation.boardFromLine, any other character is an empty cell
+    table = np.zeros(256, dtype=np.uint8)
+    for value, ch in enumerate(env.VALUE_CHARS[1:n + 1], 1):
+        table[ord(ch)] = table[ord(ch.lower())] = value
+    raw = np.frombuffer("".join(lines).encode("ascii", "replace"), dtype=np.uint8)
+    return table[raw].reshape(len(lines), n * n)
+
+def boardLines(boards):
+    """
+    Puzzle lines of a (K, n*n) array
+    """
+    chars = np.frombuffer(env.VALUE_CHARS.encode("ascii"), dtype=np.uint8)
+    return [row.tobytes().decode("ascii") for row in chars[boards]]
+
+def candidates(boards, n):
+    """
+    (masks, unitUsed, bad): candidate masks of the empty cells (0 for
+    filled ones), values used by every unit, and the boards with a value
+    twice in a unit
+    """
+    units, cellUnits = geometry(n)
+    dtype = maskType(n)
+    one = dtype(1)
+    bits = np.where(boards > 0, one << (boards.astype(dtype) - one), dtype(0)).astype(dtype)
+    inUnit = bits[:, units]
+    unitUsed = np.bitwise_or.reduce(inUnit, axis=2)
+    # A duplicate makes the used values fewer than the filled cells
+    bad = ((boards[:, units] > 0).sum(axis=2) != popcount(unitUsed)).any(axis=1)
+    used = (unitUsed[:, cellUnits[:, 0]] | unitUsed[:, cellUnits[:, 1]]
+            | unitUsed[:, cellUnits[:, 2]])
+    full = dtype((1 << n) - 1)
+    masks = np.where(boards == 0, full & ~used, dtype(0)).astype(dtype)
+    return masks, unitUsed, bad
+
+def propagateBoards(boards, stats = None, hidden = True):
+    """
+    Naked and hidden singles on every board until none changes
+    boards: (K, n*n) uint8 array, filled in place
+    Returns (boards, status) with status OPEN, SOLVED or INVALID per board
+    stats: optional dict, gets "rounds", "naked_singles" and "hidden_singles"
+    hidden: False to only fill naked singles
+    """
+    if stats is None:
+        stats = {}
+    for key in ("rounds", "naked_singles", "hidden_singles"):
+        stats.setdefault(key, 0)
+    count, cellCount = boards.shape
+    n = int(round(cellCount ** 0.5))
+    units, cellUnits = geometry(n)
+    dtype = maskType(n)
+    full = dtype((1 << n) - 1)
+    status = np.full(count, OPEN, dtype=np.uint8)
+    active = np.arange(count)
+    valueBits = (np.ones(n, dtype=dtype) << np.arange(n, dtype=dtype)).astype(dtype)
+
+    while active.size:
+        stats["rounds"] += 1
+        work = boards[active]
+        masks, unitUsed, bad = candidates(work, n)
+        empty = work == 0
+        # An empty cell without candidates, or a value with no place left
+        # in a unit, means no solution
+        bad |= (empty & (masks == 0)).any(axis=1)
+        unitCandidates = np.bitwise_or.reduce(masks[:, units], axis=2)
+        bad |= ((unitUsed | unitCandidates) != full).any(axis=1)
+        solved = ~empty.any(axis=1) & ~bad
+        status[active[bad]] = INVALID
+        status[active[solved]] = SOLVED
+
+        # Naked singles: one candidate left
+        single = empty & (masks != 0) & ((masks & (masks - dtype(1))) == 0)
+        values = np.where(single, popcount(masks - dtype(1)) + 1, 0).astype(np.uint8)
+        changed = single.any(axis=1)
+        stats["naked_singles"] += int(single[~bad].sum())
+
+        if hidden:
+            # Hidden singles: value fits in one cell of the unit, shape (K, units, values)
+            inUnit = (masks[:, units][:, :, :, None] & valueBits) != 0
+            places = inUnit.sum(axis=2)
+            board, unit, value = np.nonzero(places == 1)
+            position = inUnit[board, unit, :, value].argmax(axis=1)
+            cell = units[unit, position]
+            keep = (values[board, cell] == 0) & ~bad[board]
+            board, cell, value = board[keep], cell[keep], value[keep]
+            values[board, cell] = value + 1
+            stats["hidden_singles"] += len(np.unique(board * cellCount + cell))
+            changed[board] = True
+
+        work = np.where(values > 0, values, work)
+        boards[active] = work
+        active = active[changed & ~bad & ~solved]
+    return boards, status
+
+def solveLines(lines, engine = "mac", nodeLimit = None, stats = None):
+    """
+    Solution line (or None) of every puzzle line: vectorized propagation
+    first, then the scalar engine for every board still open
+    stats: optional dict, gets the propagateBoards counters plus
+    "propagated" (solved or refuted without search) and "searched"
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault("propagated", 0)
+    stats.setdefault("searched", 0)
+    solve = Solvers.getEngine(engine)
+    boards, status = propagateBoards(loadBoards(lines), stats)
+    results = []
+    for row, line, state in zip(boards, boardLines(boards), status):
+        if state == SOLVED:
+            stats["propagated"] += 1
+            results.append(line)
+        elif state == INVALID:
+            stats["propagated"] += 1
+            results.append(None)
+        else:
+            stats["searched"] += 1
+            board = env.sudoku.fromState(row.tobytes())
+            try:
+                solution = solve(board, {}, nodeLimit)
+            except Solvers.SearchLimitReached:
+                solution = None
+            results.append(None if solution is None else Creation.boardToLine(solution))
+    return results
@@ -13,18 +13,19 @@ import Environment as env
 import Creation
 import ArcConsistency as AC
 import SolveAC as ACS
-import Backtracking as BK
+import SolveMAC as MAC
+import Tracing as tr
 
 game = env.sudoku()
 Creation.generateRandom(game)
 print("\nInitial Board:")
 game.printBoard()
 # Step 1: Arc Consistency
-ACS.enforceArcConsistency(game)
+ACS.enforceArcConsistency(game, tracer=tr.printTracer)
 game.printBoard()
-# Step 2: Backtracking (to finish solving)
-print("\nRunning Backtracking...")
-solution = BK.backtrackingSearch(game)
+# Step 2: Search with Maintained Arc Consistency (to finish solving)
+print("\nRunning MAC search...")
+solution = MAC.macSearch(game)
 print("\nFinal Solved Board:")
 solution.printBoard()
 
@@ -0,0 +1,27 @@
+import Creation
+import Environment as env
+import random
+
+def test_line_round_trip():
+    line = "0" * 80 + "9"
+    assert Creation.boardToLine(Creation.boardFromLine(line)) == line
+    big = "P" + "0" * 624
+    board = Creation.boardFromLine(big.lower())
+    assert board.n == 25 and board.get(0, 0) == 25
+    assert Creation.boardToLine(board) == big
+
+def test_generateRandom_scales_removed_to_the_board():
+    random.seed(1)
+    for n, removed in ((4, 9), (9, 50), (16, 158), (25, 385)):
+        board = env.sudoku(n)
+        Creation.generateRandom(board)
+        assert board.emptyCount() == removed
+        assert not board.hasConflicts()
+        if n <= 9:
+            assert Creation.validateInput(board)
+
+def test_generateRandom_clamps_removed():
+    random.seed(2)
+    board = env.sudoku(4)
+    Creation.generateRandom(board, 50)
+    assert board.emptyCount() == 16
@@ -0,0 +1,26 @@
+import Creation
+import DancingLinks as DL
+import Environment as env
+import Generator
+
+def test_every_4x4_grid():
+    lines = list(DL.solutions(env.sudoku(4)))
+    assert len(lines) == len(set(lines)) == 288
+    for line in lines:
+        board = Creation.boardFromLine(line)
+        assert board.isFilled() and not board.hasConflicts()
+
+def test_solutions_keep_the_givens_and_the_board():
+    board = Creation.boardFromLine("1200" + "0" * 12)
+    lines = list(DL.solutions(board, 5))
+    assert len(lines) == 5
+    assert all(line.startswith("12") for line in lines)
+    assert board.emptyCount() == 14
+
+def test_dlxSearch_16x16():
+    record = Generator.generatePuzzle(0, 1, clues=200, n=16)
+    board = Creation.boardFromLine(record["puzzle"])
+    stats = {}
+    assert DL.dlxSearch(board, stats=stats) is board
+    assert Creation.boardToLine(board) == record["solution"]
+    assert stats["nodes"] > 0
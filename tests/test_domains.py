@@ -0,0 +1,60 @@
+import ArcConsistency as ac
+import Creation
+import Domains as dom
+import random
+
+def test_mask_helpers():
+    assert dom.bit(1) == 0b1 and dom.bit(9) == 1 << 8
+    assert dom.fullMask(9) == 0b111111111
+    assert dom.popcount(0b1011) == 3
+    assert dom.lowestValue(0b1100) == 3 and dom.lowestValue(0) == 0
+    assert dom.maskValues(0b10110) == [2, 3, 5]
+    assert dom.valuesMask([2, 3, 5]) == 0b10110
+
+def test_mark_undo_round_trip():
+    domains = dom.DomainStore()
+    before = domains.copy()
+    mark = domains.mark()
+    domains.narrow(0, dom.bit(5))
+    domains.narrow(10, 0b110)
+    inner = domains.mark()
+    domains.narrow(10, 0b100)
+    domains.narrow(80, 0)
+    domains.undo(inner)
+    assert domains.masks[10] == 0b110 and domains.masks[80] == domains.full
+    assert domains.isSingleton(0) and domains.value(0) == 5
+    domains.undo(mark)
+    assert domains == before
+    assert domains.trail == []
+
+def test_random_narrowing_undoes_exactly():
+    rng = random.Random(7)
+    domains = dom.DomainStore(16)
+    marks = []
+    states = []
+    for _ in range(200):
+        if rng.random() < 0.2:
+            marks.append(domains.mark())
+            states.append(domains.snapshot())
+        i = rng.randrange(256)
+        domains.narrow(i, domains.masks[i] & rng.getrandbits(16))
+    while marks:
+        domains.undo(marks.pop())
+        assert domains.masks == states.pop()
+
+def test_snapshot_restore_and_copy():
+    domains = dom.DomainStore(4)
+    snapshot = domains.snapshot()
+    other = domains.copy()
+    domains.assign(3, 2)
+    domains.remove(4, 1)
+    assert other != domains
+    domains.restore(snapshot)
+    assert other == domains
+
+def test_initializeDomain_follows_the_board():
+    board = Creation.boardFromLine("53007" + "0" * 76)
+    domains = ac.initializeDomain(board)
+    assert domains.values(0) == [5]
+    assert 5 not in domains.values(2) and 3 not in domains.values(9)
+    assert domains.masks[2] == board.candidates(0, 2)
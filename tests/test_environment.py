@@ -0,0 +1,109 @@
+import Environment as env
+import pytest
+
+LINE = [5, 3, 0, 0, 7, 0, 0, 0, 0] + [0] * 72
+
+def board():
+    return env.sudoku.fromState(LINE)
+
+def test_fromState():
+    b = board()
+    assert b.n == 9 and b.s == 3
+    assert b.get(0, 0) == 5 and b.get(0, 1) == 3
+    assert len(b.empty) == 78
+    assert b.state() == bytes(LINE)
+    with pytest.raises(ValueError):
+        env.sudoku.fromState([0] * 80)
+
+def test_candidates():
+    b = board()
+    assert b.candidates(1, 1) == 0b111111111 & ~(0b1 << 4 | 0b1 << 2)
+    assert b.candidates(0, 2) & (1 << 6) == 0
+
+def test_duplicates():
+    b = board()
+    b.addNum(0, 8, 5)
+    assert b.hasConflicts()
+    b.addNum(0, 8, 0)
+    assert not b.hasConflicts()
+    # the other 5 still holds the row
+    assert b.candidates(0, 8) & (1 << 4) == 0
+
+def test_copy_is_independent():
+    b = board()
+    other = b.copy()
+    other.addNum(8, 8, 9)
+    assert b.get(8, 8) == 0
+    assert (8, 8) in b.empty and (8, 8) not in other.empty
+
+def test_views():
+    b = board()
+    assert bytes(b.getRow(0)) == bytes(LINE[:9])
+    assert list(b.getCol(1)) == [3] + [0] * 8
+    square = b.getSquare(0, 1)
+    assert [list(row) for row in square] == [[0, 7, 0], [0, 0, 0], [0, 0, 0]]
+    b.addNum(1, 4, 2)
+    assert square[1][1] == 2
+    for view in (b.getRow(0), b.getCol(0), square[0]):
+        with pytest.raises(TypeError):
+            view[0] = 1
+
+def test_rollback():
+    b = board()
+    mark = b.checkpoint()
+    b.addNum(1, 1, 9)
+    b.addNum(0, 0, 0)
+    b.rollback(mark)
+    assert b.state() == bytes(LINE)
+    assert b.log is None
+    assert b.candidates(1, 1) & (1 << 8)
+
+def test_release_keeps_changes():
+    b = board()
+    mark = b.checkpoint()
+    b.addNum(1, 1, 9)
+    b.release(mark)
+    assert b.get(1, 1) == 9
+    assert b.log is None
+
+def test_nested_checkpoints():
+    b = board()
+    outer = b.checkpoint()
+    b.addNum(1, 1, 9)
+    inner = b.checkpoint()
+    b.addNum(2, 2, 8)
+    b.rollback(inner)
+    assert b.get(2, 2) == 0 and b.get(1, 1) == 9
+    # the outer checkpoint is still recording
+    b.addNum(3, 3, 7)
+    b.rollback(outer)
+    assert b.state() == bytes(LINE)
+    assert b.log is None
+
+def test_nested_checkpoint_at_mark_zero():
+    b = board()
+    outer = b.checkpoint()
+    inner = b.checkpoint()
+    assert outer == inner == 0
+    b.addNum(1, 1, 9)
+    b.release(inner)
+    b.rollback(outer)
+    assert b.state() == bytes(LINE)
+
+def test_setState_inside_a_checkpoint():
+    b = board()
+    mark = b.checkpoint()
+    b.addNum(1, 1, 9)
+    with pytest.raises(RuntimeError):
+        b.setState([0] * 81)
+    b.rollback(mark)
+    assert b.state() == bytes(LINE)
+    b.setState([0] * 81)
+    assert b.emptyCount() == 81
+
+def test_sizes():
+    for n in (4, 16, 25):
+        b = env.sudoku(n)
+        assert b.emptyCount() == n * n
+    with pytest.raises(ValueError):
+        env.sudoku(8)
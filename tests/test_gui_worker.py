@@ -0,0 +1,49 @@
+import pytest
+
+pytest.importorskip("tkinter")
+
+import BONUS_GUI as gui
+import Creation
+import Environment as env
+import SolveCache
+import queue
+import threading
+
+LINE = "000000010400000000020000000000050407008000300001090000300400200050100000000806000"
+
+@pytest.fixture(autouse=True)
+def tree_path(tmp_path, monkeypatch):
+    # the worker writes the search tree as DOT
+    monkeypatch.setattr(gui, "TREE_PATH", str(tmp_path / "tree.dot"))
+
+def run(kind, board, cache=None, cancel=None):
+    events = queue.Queue()
+    gui.solve_worker(kind, board, False, events, cancel or threading.Event(), cache)
+    finished = None
+    while not events.empty():
+        finished = events.get()
+    return finished
+
+def test_full_solve_and_cache_hit():
+    cache = SolveCache.SolveCache(10)
+    kind, result = run("full", Creation.boardFromLine(LINE), cache)
+    assert kind == "done" and result["success"]
+    solution = Creation.boardToLine(result["solution"])
+    kind, result = run("full", Creation.boardFromLine(LINE), cache)
+    assert kind == "done" and result["success"]
+    assert Creation.boardToLine(result["solution"]) == solution
+
+def test_cached_unsolvable_puzzle_is_not_a_success():
+    cache = SolveCache.SolveCache(10)
+    cache.store(LINE, None)
+    kind, result = run("full", Creation.boardFromLine(LINE), cache)
+    assert kind == "done"
+    assert not result["success"] and result["solution"] is None
+
+def test_generate_and_cancel():
+    kind, result = run("generate", env.sudoku(16))
+    assert kind == "done"
+    assert not result["board"].hasConflicts()
+    cancel = threading.Event()
+    cancel.set()
+    assert run("generate", env.sudoku(25), cancel=cancel) == ("cancelled", None)
@@ -0,0 +1,115 @@
+import Creation
+import Domains as dom
+import Propagation
+import SolveAC as ACS
+import pytest
+
+ROW = (0, 1, 2, 3)
+
+def store(*row):
+    """
+    4x4 DomainStore whose first row has the given masks, the rest full
+    """
+    return dom.DomainStore(4, list(row) + [0b1111] * 12)
+
+def test_getUnits():
+    units = Propagation.getUnits(4, 2)
+    assert len(units) == 12
+    assert units[0] == ROW
+    assert units[4] == (0, 4, 8, 12)
+    assert units[8] == (0, 1, 4, 5)
+
+def test_checkRules():
+    assert Propagation.checkRules(None) == ()
+    assert Propagation.checkRules(["hidden_pairs", "hidden_singles"]) == ("hidden_singles", "hidden_pairs")
+    with pytest.raises(ValueError):
+        Propagation.checkRules(["swordfish"])
+
+def test_hiddenSingles():
+    domains = store(0b0011, 0b1110, 0b1110, 0b1110)
+    singles = []
+    assert Propagation.hiddenSingles(domains, ROW, singles) == 1
+    assert domains.masks[0] == 0b0001
+    assert singles == [0]
+
+def test_hiddenSingles_value_fits_nowhere():
+    domains = store(0b0110, 0b0110, 0b1110, 0b1110)
+    assert Propagation.hiddenSingles(domains, ROW, []) is None
+
+def test_nakedPairs():
+    domains = store(0b0011, 0b0011, 0b0111, 0b1111)
+    singles = []
+    assert Propagation.nakedSubsets(domains, ROW, 2, singles) == 4
+    assert list(domains.masks[:4]) == [0b0011, 0b0011, 0b0100, 0b1100]
+    assert singles == [2]
+
+def test_nakedPairs_contradiction():
+    domains = store(0b0011, 0b0011, 0b0011, 0b1111)
+    assert Propagation.nakedSubsets(domains, ROW, 2, []) is None
+
+def test_nakedTriples():
+    domains = store(0b0011, 0b0110, 0b0101, 0b1111)
+    assert Propagation.nakedSubsets(domains, ROW, 3, []) == 3
+    assert domains.masks[3] == 0b1000
+
+def test_hiddenPairs():
+    domains = store(0b1011, 0b0111, 0b1100, 0b1100)
+    singles = []
+    assert Propagation.hiddenSubsets(domains, ROW, 2, singles) == 2
+    assert list(domains.masks[:4]) == [0b0011, 0b0011, 0b1100, 0b1100]
+    assert singles == []
+
+def test_hiddenPairs_overlapping_subsets_contradict():
+    # {1,2} fit only cells 0 and 1, {3,4} only cells 1 and 2: the first pair
+    # leaves cell 1 nothing of the second one
+    domains = store(0b0011, 0b1111, 0b1100, 0b0000)
+    singles = []
+    assert Propagation.hiddenSubsets(domains, ROW, 2, singles) is None
+    assert singles == []
+    assert all(mask for mask in domains.masks[:3])
+
+def test_propagate_reports_the_contradiction():
+    domains = store(0b0011, 0b1111, 0b1100, 0b0000)
+    stats = {"hidden_pairs": 0}
+    assert Propagation.propagate(domains, [ROW], ("hidden_pairs",), stats) is None
+
+def test_hiddenTriples():
+    domains = store(0b1011, 0b1110, 0b1101, 0b1000)
+    assert Propagation.hiddenSubsets(domains, ROW, 3, []) == 3
+    assert list(domains.masks[:4]) == [0b0011, 0b0110, 0b0101, 0b1000]
+
+def test_allDifferent():
+    domains = store(0b0011, 0b0011, 0b0111, 0b1111)
+    singles = []
+    assert Propagation.allDifferent(domains, ROW, singles) == 5
+    assert list(domains.masks[:4]) == [0b0011, 0b0011, 0b0100, 0b1000]
+    assert sorted(singles) == [2, 3]
+
+def test_allDifferent_no_matching():
+    domains = store(0b0001, 0b0001, 0b1110, 0b1110)
+    assert Propagation.allDifferent(domains, ROW, []) is None
+
+def test_narrow_rejects_an_empty_domain():
+    domains = store(0b0011, 0b1111, 0b1111, 0b1111)
+    with pytest.raises(ValueError):
+        Propagation._narrow(domains, 0, 0, [])
+    assert domains.masks[0] == 0b0011
+    assert domains.trail == []
+
+def test_rules_run_on_the_trail():
+    domains = store(0b0011, 0b0011, 0b0111, 0b1111)
+    mark = domains.mark()
+    Propagation.propagate(domains, [ROW], Propagation.DEFAULT_RULES,
+                          {rule: 0 for rule in Propagation.DEFAULT_RULES})
+    domains.undo(mark)
+    assert domains == store(0b0011, 0b0011, 0b0111, 0b1111)
+
+def test_rules_solve_without_search():
+    line = "000000010400000000020000000000050407008000300001090000300400200050100000000806000"
+    board = Creation.boardFromLine(line)
+    success, revisions, prunings = ACS.enforceArcConsistency(board, rules=Propagation.RULES)
+    assert success
+    plain = Creation.boardFromLine(line)
+    ACS.enforceArcConsistency(plain)
+    assert len(board.empty) <= len(plain.empty)
+    assert not board.hasConflicts()
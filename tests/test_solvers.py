@@ -0,0 +1,105 @@
+import Benchmark
+import Creation
+import DancingLinks as DL
+import Environment as env
+import SolveMAC as MAC
+import Solvers
+import pytest
+
+# Engines that finish every corpus puzzle well within NODE_LIMIT; the
+# others (plain and AC-3 backtracking) are only checked on what they solve
+FAST = ("mrv", "rules+bt", "mac", "mac+rules", "fc", "dlx")
+NODE_LIMIT = 50000
+
+def corpus():
+    # every puzzle of these buckets has a unique solution
+    return (Benchmark.loadBucket("hard")[:20] + Benchmark.loadBucket("17clue")[:5]
+            + Benchmark.loadBucket("adversarial")[:3])
+
+def isCompletion(solution, line):
+    board = Creation.boardFromLine(solution)
+    return (board.isFilled() and not board.hasConflicts()
+            and all(a == "0" or a == b for a, b in zip(line, solution)))
+
+@pytest.fixture(scope="module")
+def reference():
+    return {line: Creation.boardToLine(DL.dlxSearch(Creation.boardFromLine(line)))
+            for line in corpus()}
+
+@pytest.mark.parametrize("engine", list(Solvers.ENGINES))
+def test_engines_agree_on_the_corpus(engine, reference):
+    solved = 0
+    for line, expected in reference.items():
+        try:
+            solution, stats = Solvers.solve(Creation.boardFromLine(line), engine, NODE_LIMIT)
+        except Solvers.SearchLimitReached:
+            assert engine not in FAST, line
+            continue
+        assert solution is not None
+        assert Creation.boardToLine(solution) == expected
+        solved += 1
+    assert solved > 0
+
+@pytest.mark.parametrize("engine", list(Solvers.ENGINES))
+def test_engines_complete_easy_puzzles(engine):
+    for line in Benchmark.loadBucket("easy")[:10]:
+        solution, stats = Solvers.solve(Creation.boardFromLine(line), engine)
+        assert isCompletion(Creation.boardToLine(solution), line)
+        assert stats["nodes"] >= 0 and stats["seconds"] >= 0
+
+# Backtracking does not check the givens, a board with a conflict makes
+# it search the whole tree
+@pytest.mark.parametrize("engine", ("mac", "mac+rules", "fc", "dlx"))
+def test_unsolvable(engine):
+    # two 1s in the first row, and a puzzle that only fails deeper down
+    assert Solvers.solve(Creation.boardFromLine("11" + "0" * 79), engine)[0] is None
+    line = "123456780" + "000000009" + "0" * 63
+    assert Solvers.solve(Creation.boardFromLine(line), engine)[0] is None
+
+def test_reference_solutions(reference):
+    for line, solution in reference.items():
+        assert isCompletion(solution, line)
+
+def test_countSolutions_limit():
+    board = env.sudoku(4)
+    assert MAC.countSolutions(board, None) == 288
+    assert DL.countSolutions(board, None) == 288
+    for limit in (0, 1, 2, 5):
+        assert MAC.countSolutions(board, limit) == limit
+        assert DL.countSolutions(board, limit) == limit
+    assert board.emptyCount() == 16
+
+def test_countSolutions_found_and_unique(reference):
+    line, solution = next(iter(reference.items()))
+    board = Creation.boardFromLine(line)
+    found = []
+    assert MAC.countSolutions(board, 2, found=found) == 1
+    assert found == [solution]
+    assert Creation.boardToLine(board) == line
+    assert Solvers.hasUniqueSolution(board)
+
+def test_countSolutions_stops_at_the_second_solution():
+    # the easy bucket is random blanks, most of its puzzles have several solutions
+    line = next(line for line in Benchmark.loadBucket("easy")
+                if not Solvers.hasUniqueSolution(Creation.boardFromLine(line)))
+    found = []
+    assert MAC.countSolutions(Creation.boardFromLine(line), 2, found=found) == 2
+    assert len(set(found)) == 2
+    assert all(isCompletion(solution, line) for solution in found)
+
+def test_countSolutions_node_limit_restores_the_board():
+    line = Benchmark.loadBucket("17clue")[0]
+    board = Creation.boardFromLine(line)
+    with pytest.raises(Solvers.SearchLimitReached):
+        MAC.countSolutions(board, 2, nodeLimit=5)
+    assert Creation.boardToLine(board) == line
+    assert board.log is None
+
+def test_countSolutions_of_a_conflict():
+    board = Creation.boardFromLine("11" + "0" * 79)
+    assert MAC.countSolutions(board, 2) == 0
+    assert DL.countSolutions(board, 2) == 0
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        Solvers.getEngine("simplex")
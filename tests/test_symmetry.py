@@ -0,0 +1,66 @@
+import Benchmark
+import Creation
+import Generator
+import SolveCache
+import Symmetry
+import random
+
+def puzzles():
+    return Benchmark.loadBucket("hard")[:10] + Benchmark.loadBucket("17clue")[:5]
+
+def test_inverseTransform():
+    rng = random.Random(3)
+    for line in puzzles():
+        transform = Symmetry.randomTransform(rng)
+        moved = Symmetry.applyTransform(line, transform)
+        assert Symmetry.applyTransform(moved, Symmetry.inverseTransform(transform)) == line
+
+def test_transform_keeps_a_valid_grid():
+    rng = random.Random(4)
+    solution = Benchmark.solveLine(Benchmark.loadBucket("hard")[0])
+    for _ in range(20):
+        moved = Symmetry.applyTransform(solution, Symmetry.randomTransform(rng))
+        board = Creation.boardFromLine(moved)
+        assert board.isFilled() and not board.hasConflicts()
+
+def test_canonicalForm_invariant_under_randomTransform():
+    rng = random.Random(5)
+    for line in puzzles():
+        canonical, transform = Symmetry.canonicalForm(line)
+        assert Symmetry.applyTransform(line, transform) == canonical
+        for _ in range(5):
+            moved = Symmetry.applyTransform(line, Symmetry.randomTransform(rng))
+            assert Symmetry.canonicalForm(moved)[0] == canonical
+
+def test_canonicalForm_16x16():
+    rng = random.Random(6)
+    # random grid with about half the cells blanked (a regular pattern grid
+    # ties too often, past CANONICAL_STATES variants may differ)
+    solution = Generator.solutions([0] * 256, 1, rng=rng)[0]
+    line = "".join("0" if rng.random() < 0.5 else ch for ch in solution)
+    canonical = Symmetry.canonicalForm(line)[0]
+    for _ in range(5):
+        moved = Symmetry.applyTransform(line, Symmetry.randomTransform(rng, 16, 4))
+        assert Symmetry.canonicalForm(moved)[0] == canonical
+
+def test_cache_hits_isomorphic_puzzles():
+    rng = random.Random(7)
+    cache = SolveCache.SolveCache(2)
+    line = Benchmark.loadBucket("hard")[0]
+    solution = Benchmark.solveLine(line)
+    cache.store(line, solution)
+    transform = Symmetry.randomTransform(rng)
+    moved = Symmetry.applyTransform(line, transform)
+    assert cache.lookup(moved) == (True, Symmetry.applyTransform(solution, transform))
+    assert (cache.hits, cache.misses) == (1, 0)
+
+def test_cache_evicts_least_recently_used():
+    lines = Benchmark.loadBucket("hard")[:3]
+    cache = SolveCache.SolveCache(2)
+    cache.store(lines[0], None)
+    cache.store(lines[1], None)
+    assert cache.lookup(lines[0]) == (True, None)
+    cache.store(lines[2], None)
+    assert len(cache) == 2
+    assert cache.lookup(lines[1]) == (False, None)
+    assert cache.lookup(lines[0])[0] and cache.lookup(lines[2])[0]